@@ -1,12 +1,88 @@
 import os
+from typing import Optional
 
 
 class Settings:
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    # Optional read replica for GET routes
+    DATABASE_READ_URL: Optional[str] = os.getenv("DATABASE_READ_URL") or None
+    # Seconds after a client's write during which its reads still go to the primary
+    READ_AFTER_WRITE_WINDOW: float = float(os.getenv("READ_AFTER_WRITE_WINDOW", "5"))
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "/tmp/docproc_uploads")
+    # Connection pool, per API process. Size it so that
+    # processes x (DB_POOL_SIZE + DB_MAX_OVERFLOW) stays below Postgres max_connections
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    # Seconds a request waits for a free connection before failing
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # Replace connections older than this many seconds (-1 disables)
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    # asyncpg prepared statement cache per connection; set 0 behind PgBouncer in transaction mode
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
     # CORS: comma-separated list of allowed origins, or "*" for all (development only)
     CORS_ORIGINS: str = os.getenv("CORS_ORIGINS", "http://localhost:5173")
+    # Uploads are streamed from the request body to disk, so the limit is not bounded by memory
+    MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", str(10 * 1024 * 1024)))
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+    MAX_BATCH_FILES: int = int(os.getenv("MAX_BATCH_FILES", "100"))
+    # Upper bounds for one bulk tag request (documents x tags links)
+    MAX_BULK_TAG_DOCUMENTS: int = int(os.getenv("MAX_BULK_TAG_DOCUMENTS", "10000"))
+    MAX_BULK_TAGS: int = int(os.getenv("MAX_BULK_TAGS", "100"))
+    # In-process LRU cache for tag autocomplete (entries, seconds); 0 disables it
+    TAG_AUTOCOMPLETE_CACHE_SIZE: int = int(os.getenv("TAG_AUTOCOMPLETE_CACHE_SIZE", "1024"))
+    TAG_AUTOCOMPLETE_CACHE_TTL: float = float(os.getenv("TAG_AUTOCOMPLETE_CACHE_TTL", "30"))
+    # Cached GET /documents/{id} and /documents/{id}/tags responses, served with ETag and
+    # Last-Modified. In process (LRU bounded by bytes and entries) unless a Redis URL is set,
+    # which shares the cache and its invalidations across processes. TTL 0 disables it
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+    RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+    # Larger responses get validators but are not stored
+    RESPONSE_CACHE_MAX_ENTRY_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+    RESPONSE_CACHE_REDIS_URL: Optional[str] = os.getenv("RESPONSE_CACHE_REDIS_URL") or None
+    # Re-uploads of a known file (same SHA-256) skip parsing:
+    # "link" references the original's text, "copy" duplicates it, "off" always parses
+    DEDUP_MODE: str = os.getenv("DEDUP_MODE", "link")
+    # How page text is stored: "inline" in document_pages.text, "compressed" as zstd in
+    # document_pages.data, or "file" as zstd frames in one file per document under
+    # CONTENT_STORE_DIR. Applies to new writes; existing pages are read as they were stored
+    CONTENT_STORAGE: str = os.getenv("CONTENT_STORAGE", "inline")
+    CONTENT_STORE_DIR: str = os.getenv("CONTENT_STORE_DIR", "/tmp/docproc_content")
+    CONTENT_COMPRESSION_LEVEL: int = int(os.getenv("CONTENT_COMPRESSION_LEVEL", "3"))
+    # Seconds an exact list COUNT is reused before it is recomputed (0 disables caching)
+    COUNT_CACHE_TTL: float = float(os.getenv("COUNT_CACHE_TTL", "10"))
+    # PDF extraction pool: 0 workers runs extraction in a thread instead of subprocesses
+    PDF_EXTRACTION_WORKERS: int = int(os.getenv("PDF_EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+    # Wall-clock budget for extracting one document; the worker stops between pages once it passes
+    PDF_EXTRACTION_TIMEOUT: float = float(os.getenv("PDF_EXTRACTION_TIMEOUT", "120"))
+    # Larger documents are rejected instead of indexed (0 disables a limit)
+    PDF_MAX_PAGES: int = int(os.getenv("PDF_MAX_PAGES", "5000"))
+    PDF_MAX_CHARS: int = int(os.getenv("PDF_MAX_CHARS", "50000000"))
+    # Pages parsed per call into the extraction pool; stored before the next batch is parsed.
+    # Every call opens and parses the PDF again, so batches are large: most documents take one
+    PDF_EXTRACTION_BATCH_PAGES: int = int(os.getenv("PDF_EXTRACTION_BATCH_PAGES", "500"))
+    # Recycle a worker process after this many extraction calls, i.e. batches rather than
+    # documents; a long document may move to a fresh worker between batches (0 disables)
+    PDF_MAX_TASKS_PER_CHILD: int = int(os.getenv("PDF_MAX_TASKS_PER_CHILD", "200"))
+    # Ingest: "sync" extracts inside the upload request, "async" queues it for background workers
+    INGEST_MODE: str = os.getenv("INGEST_MODE", "sync")
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", "2"))
+    INGEST_MAX_ATTEMPTS: int = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+    # Base delay in seconds, doubled after each failed attempt
+    INGEST_RETRY_BACKOFF: float = float(os.getenv("INGEST_RETRY_BACKOFF", "5"))
+    INGEST_POLL_INTERVAL: float = float(os.getenv("INGEST_POLL_INTERVAL", "2"))
+    # A job stuck in "processing" longer than this is picked up again (worker crash)
+    INGEST_JOB_LEASE: float = float(os.getenv("INGEST_JOB_LEASE", "300"))
+    # Request profiling is off unless PROFILE_TOKEN is set. The token opts a request in
+    # (X-Profile header) and guards the /admin/profiles endpoints
+    PROFILE_TOKEN: Optional[str] = os.getenv("PROFILE_TOKEN") or None
+    # Fraction of requests profiled at random; sampled profiles are kept only when slow
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_SLOW_THRESHOLD: float = float(os.getenv("PROFILE_SLOW_THRESHOLD", "1"))
+    # Profiles kept in memory per process, oldest dropped first
+    PROFILE_MAX_STORED: int = int(os.getenv("PROFILE_MAX_STORED", "50"))
 
     def __init__(self):
         # Validate required environment variables
@@ -20,6 +96,16 @@ class Settings:
                 "SECRET_KEY environment variable must be set. "
                 "Generate a secure random key for production use."
             )
+        if self.INGEST_MODE not in ("sync", "async"):
+            raise ValueError("INGEST_MODE must be either 'sync' or 'async'")
+        if self.DEDUP_MODE not in ("link", "copy", "off"):
+            raise ValueError("DEDUP_MODE must be one of 'link', 'copy' or 'off'")
+        if self.CONTENT_STORAGE not in ("inline", "compressed", "file"):
+            raise ValueError("CONTENT_STORAGE must be one of 'inline', 'compressed' or 'file'")
+        if self.DB_POOL_SIZE < 1:
+            raise ValueError("DB_POOL_SIZE must be at least 1")
+        if not 0 <= self.PROFILE_SAMPLE_RATE <= 1:
+            raise ValueError("PROFILE_SAMPLE_RATE must be between 0 and 1")
 
     def get_cors_origins(self) -> list[str]:
         """Parse CORS origins from environment variable."""
@@ -1,43 +1,176 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.engine import make_url
 from sqlalchemy import text
+from fastapi import Request
 import logging
 
 from app.config import settings
+from app.services.db_metrics import InstrumentedQueuePool, register_engine
+from app.services.read_routing import wrote_recently
 
 logger = logging.getLogger(__name__)
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False)
+
+def _connect_args(database_url: str) -> dict:
+    if make_url(database_url).get_driver_name() == "asyncpg":
+        return {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    return {}
+
+
+def _create_engine(database_url: str):
+    return create_async_engine(
+        database_url,
+        echo=False,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=_connect_args(database_url),
+    )
+
+
+engine = _create_engine(settings.DATABASE_URL)
+register_engine("primary", engine)
 
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Optional streaming replica for GET routes; without one, reads use the primary
+read_engine = _create_engine(settings.DATABASE_READ_URL) if settings.DATABASE_READ_URL else None
+if read_engine is not None:
+    register_engine("replica", read_engine)
+
+read_async_session = (
+    async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+    if read_engine is not None
+    else async_session
+)
+
 Base = declarative_base()
 
+# Columns added after the initial schema. create_all() does not alter existing
+# tables, so these keep older databases in step with the models.
+SCHEMA_UPGRADES = [
+    "ALTER TABLE processing_statuses ADD COLUMN IF NOT EXISTS file_path VARCHAR(512)",
+    "ALTER TABLE processing_statuses ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE processing_statuses ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP",
+    "ALTER TABLE processing_statuses ADD COLUMN IF NOT EXISTS created_at TIMESTAMP",
+    """
+    CREATE INDEX IF NOT EXISTS idx_processing_status_queue
+    ON processing_statuses (status, next_attempt_at)
+    """,
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS duplicate_of_id INTEGER REFERENCES documents(id)",
+    "CREATE INDEX IF NOT EXISTS idx_document_content_hash ON documents (content_hash)",
+    "CREATE INDEX IF NOT EXISTS idx_document_duplicate_of ON documents (duplicate_of_id)",
+    # Replaced by the full-text search_vector column; only cost writes
+    "DROP INDEX IF EXISTS idx_document_content_gin",
+    # (created_at, id) replaces the single-column created_at index
+    "CREATE INDEX IF NOT EXISTS idx_document_created_at_id ON documents (created_at, id)",
+    "DROP INDEX IF EXISTS idx_document_created_at",
+    "CREATE INDEX IF NOT EXISTS idx_tag_name_id ON tags (name, id)",
+    """
+    CREATE INDEX IF NOT EXISTS idx_document_tags_tag_document
+    ON document_tags (tag_id, document_id)
+    """,
+    # Backfilled once, when the column is first added; kept current by the tag routes after that
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'tags' AND column_name = 'document_count'
+        ) THEN
+            ALTER TABLE tags ADD COLUMN document_count INTEGER NOT NULL DEFAULT 0;
+            UPDATE tags SET document_count = links.n
+            FROM (SELECT tag_id, count(*) AS n FROM document_tags GROUP BY tag_id) AS links
+            WHERE tags.id = links.tag_id;
+        END IF;
+    END $$
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_tag_document_count ON tags (document_count DESC, name)",
+    "CREATE INDEX IF NOT EXISTS idx_tag_name_prefix ON tags (name text_pattern_ops)",
+    # Weighted full-text vector over filename and text, written by content_store from
+    # then on. Documents from before it existed are indexed here from their content,
+    # with the same weights, SEARCH_CONFIG and SEARCH_MAX_INDEXED_CHARS (app.models)
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'documents' AND column_name = 'search_vector'
+        ) THEN
+            ALTER TABLE documents ADD COLUMN search_vector tsvector;
+            UPDATE documents SET search_vector =
+                setweight(to_tsvector('english', coalesce(filename, '')), 'A')
+                || setweight(to_tsvector('english', left(coalesce(content, ''), 500000)), 'B')
+            WHERE search_vector IS NULL;
+        END IF;
+    END $$
+    """,
+    "ALTER TABLE document_pages ADD COLUMN IF NOT EXISTS data BYTEA",
+    "ALTER TABLE document_pages ADD COLUMN IF NOT EXISTS data_offset BIGINT",
+    "ALTER TABLE document_pages ADD COLUMN IF NOT EXISTS data_length INTEGER",
+]
+
 
 async def get_db():
     async with async_session() as session:
         yield session
 
 
+def read_sessionmaker(request: Request) -> async_sessionmaker:
+    """
+    Session factory for a read-only request: the replica, unless there is none
+    or the client wrote within READ_AFTER_WRITE_WINDOW (read-your-writes).
+    """
+    if read_engine is None or wrote_recently(request):
+        return async_session
+    return read_async_session
+
+
+async def get_read_db(request: Request):
+    async with read_sessionmaker(request)() as session:
+        yield session
+
+
 async def init_db():
     async with engine.begin() as conn:
         # Create all tables
         await conn.run_sync(Base.metadata.create_all)
 
-        # Enable pg_trgm extension for better text search (if not already enabled)
-        # This allows GIN indexes with gin_trgm_ops for ILIKE queries
-        try:
-            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm;"))
-            # Create GIN index for content search if it doesn't exist
+        for statement in SCHEMA_UPGRADES:
+            await conn.execute(text(statement))
+
+        # Databases that had search_vector generated from content keep their vectors;
+        # it is now written by content_store, since new text lives in the pages
+        await conn.execute(
+            text("ALTER TABLE documents ALTER COLUMN search_vector DROP EXPRESSION IF EXISTS")
+        )
+        # Same for page vectors, written by page_store since page text may be compressed
+        await conn.execute(
+            text("ALTER TABLE document_pages ALTER COLUMN search_vector DROP EXPRESSION IF EXISTS")
+        )
+        await conn.execute(
+            text("""
+                CREATE INDEX IF NOT EXISTS idx_document_search_vector
+                ON documents USING gin(search_vector)
+            """)
+        )
+
+    # Trigram index for substring tag autocomplete. Creating the extension may
+    # need privileges the app user lacks, so it runs in its own transaction
+    # and the app works (with slower substring matches) without it.
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
             await conn.execute(
                 text("""
-                    CREATE INDEX IF NOT EXISTS idx_document_content_gin
-                    ON documents USING gin(content gin_trgm_ops);
+                    CREATE INDEX IF NOT EXISTS idx_tag_name_trgm
+                    ON tags USING gin(name gin_trgm_ops)
                 """)
             )
-            logger.info("Successfully created pg_trgm extension and GIN index for content search")
-        except Exception as e:
-            # Extension might not be available or index might already exist
-            # This is not critical for basic functionality
-            logger.warning(f"Could not create pg_trgm extension or GIN index: {e}")
-            logger.info("Continuing without pg_trgm extension - basic search will still work")
+    except Exception as e:
+        logger.warning(f"Could not create pg_trgm index for tag autocomplete: {e}")
@@ -2,20 +2,39 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from app.database import init_db
-from app.routes import documents, search, tags
+from app.database import init_db, engine, read_engine
+from app.routes import admin, documents, search, tags
+from app.services.pdf_processor import shutdown_extraction_pool
+from app.services.ingest_worker import start_ingest_workers, stop_ingest_workers
+from app.services.db_metrics import engine_pool_status
+from app.services.metrics import record_request_metrics, render_metrics
+from app.services.profiling import profile_requests
+from app.services.read_routing import mark_writes
+from app.services.response_cache import close_response_cache
 from app.config import settings
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    start_ingest_workers()
     yield
+    await stop_ingest_workers()
+    shutdown_extraction_pool()
+    await close_response_cache()
+    await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
 
 
 app = FastAPI(title="DocProc API", version="0.1.0", lifespan=lifespan)
 
+app.middleware("http")(mark_writes)
+app.middleware("http")(record_request_metrics)
+app.middleware("http")(profile_requests)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.get_cors_origins(),
@@ -27,8 +46,21 @@ app.add_middleware(
 app.include_router(documents.router, tags=["documents"])
 app.include_router(search.router, tags=["search"])
 app.include_router(tags.router, tags=["tags"])
+app.include_router(admin.router, tags=["admin"])
 
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/health/db-pool")
+async def db_pool_health():
+    """Connection pool occupancy and checkout wait histogram for this process."""
+    return engine_pool_status()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of this process's request, upload, PDF and database metrics."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,14 +1,23 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Integer, String, Text, DateTime, ForeignKey, Index, Table, LargeBinary
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 
 from app.database import Base
 
+# Text search configuration used both for the generated column and for queries
+SEARCH_CONFIG = "english"
+
+# Only the first N characters of content are indexed; Postgres caps a tsvector at 1MB
+SEARCH_MAX_INDEXED_CHARS = 500_000
+
 document_tags = Table(
     "document_tags",
     Base.metadata,
     Column("document_id", Integer, ForeignKey("documents.id"), primary_key=True),
     Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    # The primary key serves lookups by document; this one serves lookups by tag
+    Index("idx_document_tags_tag_document", "tag_id", "document_id"),
 )
 
 
@@ -17,20 +26,64 @@ class Document(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), nullable=False)
-    content = Column(Text)
+    # Full text of documents stored before page-level storage; newer documents
+    # keep their text only in document_pages. Read it with content_store.load_content.
+    # Deferred: entity queries never pull the full text, and implicit access raises.
+    content = deferred(Column(Text), raiseload=True)
     file_size = Column(Integer)
     page_count = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # SHA-256 of the uploaded file, used to skip re-parsing identical uploads
+    content_hash = Column(String(64), nullable=True)
+    # Set on re-uploads stored in DEDUP_MODE=link: text lives on the referenced document
+    duplicate_of_id = Column(Integer, ForeignKey("documents.id"), nullable=True)
+    # Filename (weight A) and the first SEARCH_MAX_INDEXED_CHARS of text (weight B),
+    # written by content_store.update_search_vectors so search never reads the text itself
+    search_vector = deferred(Column(TSVECTOR), raiseload=True)
 
     processing_status = relationship(
         "ProcessingStatus", back_populates="document", uselist=False
     )
     tags = relationship("Tag", secondary=document_tags, back_populates="documents")
+    pages = relationship("DocumentPage", back_populates="document", lazy="noload")
 
     __table_args__ = (
         Index("idx_document_filename", "filename"),
-        Index("idx_document_created_at", "created_at"),
+        # Keyset pagination order for the document list
+        Index("idx_document_created_at_id", "created_at", "id"),
+        Index("idx_document_content_hash", "content_hash"),
+        Index("idx_document_duplicate_of", "duplicate_of_id"),
+        Index("idx_document_search_vector", "search_vector", postgresql_using="gin"),
     )
+    # No server-side values to fetch back after an INSERT: search_vector is set by a
+    # separate UPDATE (content_store.update_search_vectors) once the row has an id,
+    # and the ORM must not load it (deferred, raiseload)
+    __mapper_args__ = {"eager_defaults": False}
+
+
+class DocumentPage(Base):
+    """Extracted text of a single PDF page, so readers can fetch page ranges."""
+
+    __tablename__ = "document_pages"
+
+    document_id = Column(Integer, ForeignKey("documents.id"), primary_key=True)
+    # 1-based, matching the page numbers shown by PDF viewers
+    page_number = Column(Integer, primary_key=True)
+    # The page text is stored one way, per CONTENT_STORAGE when it was written:
+    # raw in text, zstd in data, or as a zstd frame at data_offset in the
+    # document's file under CONTENT_STORE_DIR (see content_store)
+    text = Column(Text)
+    data = Column(LargeBinary)
+    data_offset = Column(BigInteger)
+    # Compressed size in bytes
+    data_length = Column(Integer)
+    # Used to report which page of a search hit matched; looked up by document_id.
+    # Written from the text by page_store.store_pages
+    search_vector = deferred(Column(TSVECTOR), raiseload=True)
+
+    document = relationship("Document", back_populates="pages")
+
+    __mapper_args__ = {"eager_defaults": False}
 
 
 class ProcessingStatus(Base):
@@ -38,12 +91,23 @@ class ProcessingStatus(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
-    status = Column(String(50), default="completed")
+    # queued -> processing -> completed | failed
+    status = Column(String(50), default="queued")
     error_message = Column(Text, nullable=True)
     processed_at = Column(DateTime, nullable=True)
+    # Ingest queue bookkeeping (only used when INGEST_MODE=async)
+    file_path = Column(String(512), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    # When a queued job becomes eligible again, or when a processing job's lease expires
+    next_attempt_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
     document = relationship("Document", back_populates="processing_status")
 
+    __table_args__ = (
+        Index("idx_processing_status_queue", "status", "next_attempt_at"),
+    )
+
 
 class Tag(Base):
     __tablename__ = "tags"
@@ -51,9 +115,17 @@ class Tag(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False, unique=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Number of linked documents, maintained alongside document_tags writes
+    document_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     documents = relationship("Document", secondary=document_tags, back_populates="tags")
 
     __table_args__ = (
         Index("idx_tag_name", "name"),
+        # Keyset pagination order for the tag list
+        Index("idx_tag_name_id", "name", "id"),
+        # Top-N facets without scanning document_tags
+        Index("idx_tag_document_count", document_count.desc(), "name"),
+        # LIKE 'term%' autocomplete, independent of the database collation
+        Index("idx_tag_name_prefix", "name", postgresql_ops={"name": "text_pattern_ops"}),
     )
@@ -0,0 +1,44 @@
+import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from app.config import settings
+from app.schemas import ProfileSummary, ProfileDetail
+from app.services.profiling import list_profiles, get_profile, clear_profiles, token_matches
+
+logger = logging.getLogger(__name__)
+
+
+def require_profile_token(x_profile_token: Optional[str] = Header(None)) -> None:
+    """Allow only callers presenting PROFILE_TOKEN; hide the endpoints when it is unset."""
+    if not settings.PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token_matches(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Profile-Token header")
+
+
+router = APIRouter(dependencies=[Depends(require_profile_token)])
+
+
+@router.get("/admin/profiles", response_model=List[ProfileSummary])
+async def get_profiles():
+    """Stored request profiles of this process, newest first, without their stats."""
+    return list_profiles()
+
+
+@router.get("/admin/profiles/{profile_id}", response_model=ProfileDetail)
+async def get_profile_detail(profile_id: str):
+    """One stored profile with its SQL statements and cProfile stats."""
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
+@router.delete("/admin/profiles")
+async def delete_profiles():
+    """Drop all stored profiles of this process."""
+    deleted = clear_profiles()
+    logger.info(f"Cleared {deleted} stored profiles")
+    return {"deleted": deleted}
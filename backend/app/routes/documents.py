@@ -2,27 +2,51 @@ import os
 import re
 import uuid
 import logging
-import aiofiles
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, UploadFile, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import PositiveInt
-from sqlalchemy import select, delete, func
+from sqlalchemy import select, delete, update, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.models import Document, ProcessingStatus, Tag, document_tags
-from app.schemas import DocumentResponse, DocumentDetail, PaginatedResponse
-from app.services.pdf_processor import extract_text_from_pdf
+from app.database import get_db, get_read_db, read_sessionmaker
+from app.models import Document, DocumentPage, ProcessingStatus, document_tags
+from app.schemas import (
+    BatchUploadResponse,
+    BatchUploadResult,
+    DocumentResponse,
+    DocumentDetail,
+    DocumentPageResponse,
+    DocumentPagesResponse,
+    PaginatedResponse,
+)
+from app.services.page_store import copy_pages, delete_pages, extract_and_store_pages, move_pages
+from app.services.content_store import PAGE_TEXT_COLUMNS, decode_pages, load_content, update_search_vectors
+from app.services.ingest_worker import notify_ingest_workers
+from app.services.batch_ingest import ingest_batch
+from app.services.upload_storage import FileTooLargeError, ReceivedFile, UploadError, receive_files
+from app.services.pagination import encode_cursor, decode_cursor
+from app.services.counting import CountStrategy, count_rows, invalidate_counts
+from app.services.metrics import UPLOAD_FILES, UPLOAD_STAGE_DURATION
+from app.services.response_cache import (
+    cache_response,
+    document_cache_key,
+    get_cached_response,
+    invalidate_documents,
+)
+from app.services.tagging import TagMatch, build_tag_filter, delete_tag_links
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_FILE_SIZE = settings.MAX_FILE_SIZE
 ALLOWED_MIME_TYPES = ["application/pdf"]
 ALLOWED_EXTENSIONS = [".pdf"]
+MAX_PAGES_PER_REQUEST = 50
+TEXT_STREAM_BATCH_PAGES = 20
 
 
 def sanitize_filename(filename: str) -> str:
@@ -34,131 +58,403 @@ def sanitize_filename(filename: str) -> str:
     return safe_filename
 
 
-@router.post("/documents")
-async def upload_document(file: UploadFile, db: AsyncSession = Depends(get_db)):
-    if file.content_type not in ALLOWED_MIME_TYPES:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid file type. Only PDF files are allowed. Got: {file.content_type}"
-        )
+def _upload_error(filename: str, content_type: Optional[str]) -> Optional[str]:
+    """Why an incoming file is not an acceptable PDF; checked before any of it is written."""
+    if content_type not in ALLOWED_MIME_TYPES:
+        return f"Invalid file type. Only PDF files are allowed. Got: {content_type}"
+    if not filename or not filename.lower().endswith('.pdf'):
+        return "Invalid file extension. Only .pdf files are allowed."
+    return None
 
-    if not file.filename or not file.filename.lower().endswith('.pdf'):
-        raise HTTPException(
-            status_code=400,
-            detail="Invalid file extension. Only .pdf files are allowed."
-        )
 
-    safe_filename = sanitize_filename(file.filename)
+async def _receive_uploads(
+    request: Request, field_name: str, max_files: int, fail_fast: bool
+) -> list[ReceivedFile]:
+    """
+    Validate the request's files and stream them to UPLOAD_DIR as they arrive.
 
-    content = await file.read()
-    file_size = len(content)
+    Returns:
+        The received files; with fail_fast every one of them was stored
 
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Maximum size is {MAX_FILE_SIZE / (1024 * 1024):.1f}MB"
+    Raises:
+        HTTPException: 413 if the request (or with fail_fast a file) is too
+            large, 400 if it is not an upload form or a file is rejected
+    """
+    try:
+        uploads = await receive_files(
+            request,
+            field_name,
+            settings.UPLOAD_DIR,
+            MAX_FILE_SIZE,
+            max_files,
+            settings.UPLOAD_CHUNK_SIZE,
+            _upload_error,
+            fail_fast,
         )
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    for upload in uploads:
+        if upload.file_path is not None:
+            logger.info(
+                f"Stored upload {sanitize_filename(upload.filename)}: "
+                f"{upload.file_size} bytes, sha256={upload.checksum}"
+            )
+    return uploads
+
+
+def _upload_form(field_name: str, multiple: bool) -> dict:
+    """OpenAPI request body of an upload route, which reads its form itself."""
+    file_schema = {"type": "string", "format": "binary"}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": [field_name],
+                        "properties": {
+                            field_name: {"type": "array", "items": file_schema} if multiple else file_schema,
+                        },
+                    }
+                }
+            },
+        }
+    }
+
+
+@router.post("/documents", openapi_extra=_upload_form("file", multiple=False))
+async def upload_document(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Upload a PDF document (multipart form field "file").
 
-    if file_size == 0:
-        raise HTTPException(status_code=400, detail="File is empty")
-
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-
-    file_path = os.path.join(settings.UPLOAD_DIR, safe_filename)
+    With INGEST_MODE=sync the text is extracted before responding. With
+    INGEST_MODE=async the file is stored, a "queued" job is recorded and the
+    endpoint returns 202; background workers extract the text later.
+    """
+    uploads = await _receive_uploads(request, "file", max_files=1, fail_fast=True)
+    if not uploads:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+    upload = uploads[0]
+    safe_filename = sanitize_filename(upload.filename)
+    file_path, file_size, checksum = upload.file_path, upload.file_size, upload.checksum
+
+    if settings.DEDUP_MODE != "off":
+        with UPLOAD_STAGE_DURATION.time(stage="dedup_lookup"):
+            original = await _find_processed_original(db, checksum)
+        if original is not None:
+            os.remove(file_path)
+            result = await _create_duplicate_document(db, original, safe_filename, file_size, checksum)
+            UPLOAD_FILES.inc(outcome="duplicate")
+            return result
 
-    async with aiofiles.open(file_path, "wb") as f:
-        await f.write(content)
+    if settings.INGEST_MODE == "async":
+        result = await _enqueue_document(db, response, safe_filename, file_path, file_size, checksum)
+        UPLOAD_FILES.inc(outcome="queued")
+        return result
 
     try:
         logger.info(f"Processing PDF: {safe_filename} (size: {file_size} bytes)")
 
-        text_content, page_count = await extract_text_from_pdf(file_path)
+        document = Document(filename=safe_filename, file_size=file_size, content_hash=checksum)
+        db.add(document)
+        await db.flush()
+
+        # Pages are inserted batch by batch while later ones are still being parsed
+        with UPLOAD_STAGE_DURATION.time(stage="extract"):
+            search_text, page_count = await extract_and_store_pages(db, document.id, file_path)
 
         logger.info(f"Successfully processed PDF: {safe_filename} ({page_count} pages)")
-    except Exception as e:
+
+        with UPLOAD_STAGE_DURATION.time(stage="db_commit"):
+            await update_search_vectors(db, {document.id: search_text})
+            document.page_count = page_count
+            document.processing_status = ProcessingStatus(
+                status="completed",
+                processed_at=datetime.utcnow(),
+            )
+            await db.commit()
+        invalidate_counts("documents")
+        UPLOAD_FILES.inc(outcome="completed")
+        logger.info(f"Document created: ID={document.id}, filename={safe_filename}")
+    except ValueError as e:
+        await db.rollback()
         logger.error(f"Failed to process PDF {safe_filename}: {str(e)}")
+        UPLOAD_FILES.inc(outcome="failed")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to process PDF: {str(e)}"
+        )
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to save document {safe_filename}: {str(e)}")
+        UPLOAD_FILES.inc(outcome="failed")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to save document: {str(e)}"
+        )
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    return {"id": document.id, "filename": document.filename}
+
+
+@router.post(
+    "/documents/batch",
+    response_model=BatchUploadResponse,
+    openapi_extra=_upload_form("files", multiple=True),
+)
+async def upload_documents_batch(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Upload many PDFs in one request (repeated multipart form field "files").
+
+    Files are validated and stored one by one as they arrive, extracted in
+    parallel on the extraction pool (or queued when INGEST_MODE=async), and
+    written with a few bulk INSERT ... RETURNING statements in a single
+    transaction. The outcome is reported per file; one bad file does not
+    fail the batch.
+    """
+    uploads = await _receive_uploads(request, "files", settings.MAX_BATCH_FILES, fail_fast=False)
+    if not uploads:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    results: list[Optional[BatchUploadResult]] = [None] * len(uploads)
+    items = []
+    for index, upload in enumerate(uploads):
+        if upload.error is not None:
+            results[index] = BatchUploadResult(
+                filename=upload.filename, status="failed", error=upload.error
+            )
+            continue
+        items.append({
+            "index": index,
+            "filename": sanitize_filename(upload.filename),
+            "file_path": upload.file_path,
+            "file_size": upload.file_size,
+            "checksum": upload.checksum,
+        })
+
+    if items:
+        try:
+            await ingest_batch(db, items)
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to save document batch: {str(e)}")
+            UPLOAD_FILES.inc(len(items), outcome="failed")
+            for item in items:
+                if os.path.exists(item["file_path"]):
+                    os.remove(item["file_path"])
+                item.pop("status", None)
+                item.pop("duplicate_of", None)
+                item.setdefault("error", f"Failed to save document: {str(e)}")
+
+        invalidate_counts("documents")
+        if settings.INGEST_MODE == "async":
+            notify_ingest_workers()
+
+    for item in items:
+        results[item["index"]] = BatchUploadResult(
+            filename=item["filename"],
+            status=item.get("status", "failed"),
+            id=item.get("id") if "error" not in item else None,
+            duplicate_of=item.get("duplicate_of"),
+            error=item.get("error"),
+        )
+
+    failed = sum(1 for result in results if result.status == "failed")
+    return BatchUploadResponse(results=results, succeeded=len(results) - failed, failed=failed)
+
 
+async def _enqueue_document(
+    db: AsyncSession,
+    response: Response,
+    safe_filename: str,
+    file_path: str,
+    file_size: int,
+    checksum: str,
+) -> dict:
+    """Record the document and its queued ingest job in one commit and return 202."""
+    try:
+        document = Document(filename=safe_filename, file_size=file_size, content_hash=checksum)
+        document.processing_status = ProcessingStatus(status="queued", file_path=file_path)
+        db.add(document)
+        await db.flush()
+        # Indexes the filename until the worker stores the text
+        await update_search_vectors(db, {document.id: None})
+        await db.commit()
+        invalidate_counts("documents")
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to queue document {safe_filename}: {str(e)}")
         if os.path.exists(file_path):
             os.remove(file_path)
         raise HTTPException(
-            status_code=400,
-            detail=f"Failed to process PDF: {str(e)}"
+            status_code=500,
+            detail=f"Failed to save document: {str(e)}"
+        )
+
+    logger.info(f"Document queued for processing: ID={document.id}, filename={safe_filename}")
+    notify_ingest_workers()
+
+    response.status_code = 202
+    return {"id": document.id, "filename": document.filename, "status": "queued"}
+
+
+async def _find_processed_original(db: AsyncSession, checksum: str):
+    """Return (id, page_count) of the already-extracted document for this hash, if any."""
+    result = await db.execute(
+        select(Document.id, Document.page_count)
+        .where(
+            Document.content_hash == checksum,
+            Document.duplicate_of_id.is_(None),
+            Document.page_count.is_not(None),
         )
+        .order_by(Document.id)
+        .limit(1)
+    )
+    return result.first()
+
 
+async def _create_duplicate_document(
+    db: AsyncSession,
+    original,
+    safe_filename: str,
+    file_size: int,
+    checksum: str,
+) -> dict:
+    """Store a re-upload by reusing the original's extracted text instead of parsing again."""
     try:
         document = Document(
             filename=safe_filename,
-            content=text_content,
             file_size=file_size,
-            page_count=page_count,
+            page_count=original.page_count,
+            content_hash=checksum,
         )
-        db.add(document)
-        await db.commit()
-
-        await db.refresh(document)
-        logger.info(f"Document created: ID={document.id}, filename={safe_filename}")
-
-        processing_status = ProcessingStatus(
-            document_id=document.id,
+        if settings.DEDUP_MODE == "link":
+            document.duplicate_of_id = original.id
+        document.processing_status = ProcessingStatus(
             status="completed",
             processed_at=datetime.utcnow(),
         )
-        db.add(processing_status)
-
+        db.add(document)
+        await db.flush()
+        if settings.DEDUP_MODE == "copy":
+            content = await load_content(db, original.id)
+            await update_search_vectors(db, {document.id: content})
+            await copy_pages(db, original.id, document.id)
+        else:
+            # A link has no text of its own; search returns it alongside the original
+            await update_search_vectors(db, {document.id: None})
         await db.commit()
+        invalidate_counts("documents")
     except Exception as e:
-        logger.error(f"Failed to save document {safe_filename}: {str(e)}")
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        await db.rollback()
+        logger.error(f"Failed to save duplicate document {safe_filename}: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to save document: {str(e)}"
         )
-    finally:
-        if os.path.exists(file_path):
-            os.remove(file_path)
 
-    return {"id": document.id, "filename": document.filename}
+    logger.info(
+        f"Document created from existing content: ID={document.id}, "
+        f"filename={safe_filename}, duplicate_of={original.id}"
+    )
+    return {"id": document.id, "filename": document.filename, "duplicate_of": original.id}
 
 
 @router.get("/documents", response_model=PaginatedResponse[DocumentResponse])
 async def list_documents(
     skip: int = Query(0, ge=0, description="Number of documents to skip"),
     limit: int = Query(5, ge=1, le=1000, description="Maximum number of documents to return"),
-    tag: Optional[str] = Query(None, description="Filter documents by tag name"),
-    db: AsyncSession = Depends(get_db)
+    tag: List[str] = Query([], description="Filter by tag name; repeat for several tags"),
+    tag_match: TagMatch = Query(TagMatch.all, description="Documents must have all (AND) or any (OR) of the tags"),
+    exclude_tag: List[str] = Query([], description="Leave out documents with this tag; repeatable (NOT)"),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from a previous page"),
+    count: CountStrategy = Query(CountStrategy.exact, description="How to compute total: exact, estimated or none"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     List documents with pagination and optional tag filtering.
 
+    ?tag=a&tag=b returns documents tagged with both (tag_match=all) or either
+    (tag_match=any); ?exclude_tag=c leaves out documents tagged c.
+
+    Documents are ordered newest first by (created_at, id). Every page returns a
+    next_cursor; passing it back fetches the following page with a keyset
+    condition instead of OFFSET, so deep pages cost the same as the first one.
+
     Args:
-        skip: Number of documents to skip (default: 0)
+        skip: Number of documents to skip (default: 0, offset mode only)
         limit: Maximum number of documents to return (default: 5, max: 1000)
-        tag: Optional tag name to filter documents
+        tag: Tag names to filter documents by
+        tag_match: all (AND) or any (OR) of the tag filters
+        exclude_tag: Tag names documents must not have
+        cursor: Keyset cursor returned as next_cursor by the previous page
+        count: exact (cached for COUNT_CACHE_TTL seconds), estimated (planner statistics) or none
         db: Database session
     """
-    from sqlalchemy.orm import selectinload
+    from sqlalchemy.orm import selectinload, load_only
 
-    count_query = select(func.count(Document.id))
-    if tag:
-        count_query = count_query.join(Document.tags).where(Tag.name == tag)
+    if cursor and skip:
+        raise HTTPException(status_code=400, detail="skip cannot be combined with cursor")
 
-    total_result = await db.execute(count_query)
-    total = total_result.scalar_one()
+    tag_filter = await build_tag_filter(db, Document.id, tag, tag_match, exclude_tag)
+    matched = select(Document.id).where(*tag_filter)
+    tag_key = (tuple(sorted(tag)), tag_match.value, tuple(sorted(exclude_tag))) if tag_filter else None
+    count_key = ("documents", tag_key)
+    total, total_is_estimate = await count_rows(db, matched, count, count_key)
 
+    # Only the columns DocumentResponse needs; the text stays in the database
     query = select(Document).options(
+        load_only(
+            Document.id,
+            Document.filename,
+            Document.file_size,
+            Document.page_count,
+            Document.created_at,
+        ),
         selectinload(Document.processing_status),
         selectinload(Document.tags)
     )
 
-    if tag:
-        query = query.join(Document.tags).where(Tag.name == tag)
+    query = query.where(*tag_filter)
 
-    query = query.offset(skip).limit(limit).order_by(Document.created_at.desc())
+    if cursor:
+        try:
+            last_created_at, last_id = decode_cursor(cursor, datetime, int)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(
+            tuple_(Document.created_at, Document.id) < tuple_(last_created_at, last_id)
+        )
+
+    # One extra row tells us whether another page exists without counting
+    query = (
+        query.order_by(Document.created_at.desc(), Document.id.desc())
+        .offset(skip)
+        .limit(limit + 1)
+    )
 
     result = await db.execute(query)
     documents = result.scalars().all()
 
+    has_next = len(documents) > limit
+    documents = documents[:limit]
+    next_cursor = None
+    if has_next:
+        next_cursor = encode_cursor(documents[-1].created_at, documents[-1].id)
+
     response = []
     for doc in documents:
         status = doc.processing_status
@@ -179,16 +475,38 @@ async def list_documents(
         total=total,
         skip=skip,
         limit=limit,
-        has_next=(skip + limit) < total,
-        has_prev=skip > 0,
+        has_next=has_next,
+        has_prev=skip > 0 or cursor is not None,
+        next_cursor=next_cursor,
+        total_is_estimate=total_is_estimate,
     )
 
 
 @router.get("/documents/{document_id}")
-async def get_document(document_id: PositiveInt, db: AsyncSession = Depends(get_db)):
+async def get_document(
+    document_id: PositiveInt,
+    request: Request,
+    include_content: bool = Query(True, description="Include the full extracted text"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get document details.
+
+    Large documents are better read with include_content=false plus the
+    /documents/{id}/pages endpoint, which transfers only the requested pages.
+
+    Processed documents are served from the response cache when possible,
+    and clients sending If-None-Match or If-Modified-Since get 304 Not
+    Modified while their copy is current.
+    """
     from sqlalchemy.orm import selectinload
 
-    result = await db.execute(
+    cache_key = document_cache_key(document_id, include_content)
+    cached = await get_cached_response(cache_key)
+    if cached is not None:
+        return cached.to_response(request)
+
+    query = (
         select(Document)
         .options(
             selectinload(Document.processing_status),
@@ -196,6 +514,8 @@ async def get_document(document_id: PositiveInt, db: AsyncSession = Depends(get_
         )
         .where(Document.id == document_id)
     )
+
+    result = await db.execute(query)
     document = result.scalar_one_or_none()
 
     if not document:
@@ -203,24 +523,119 @@ async def get_document(document_id: PositiveInt, db: AsyncSession = Depends(get_
 
     status = document.processing_status
 
-    return DocumentDetail(
+    content = None
+    if include_content:
+        # Linked duplicates read their original's text
+        content = await load_content(db, document.duplicate_of_id or document.id)
+
+    detail = DocumentDetail(
         id=document.id,
         filename=document.filename,
-        content=document.content,
+        content=content,
         file_size=document.file_size,
         page_count=document.page_count,
         status=status.status if status else "unknown",
         created_at=document.created_at,
         tags=document.tags or [],
     )
+    # Queued documents still change when their ingest job completes
+    entry = await cache_response(
+        cache_key,
+        detail.model_dump_json().encode(),
+        store=detail.status == "completed",
+    )
+    return entry.to_response(request)
+
+
+async def _get_text_source(db: AsyncSession, document_id: int):
+    """Return (text_source_id, page_count) for a document; linked duplicates read their original's pages."""
+    result = await db.execute(
+        select(Document.id, Document.duplicate_of_id, Document.page_count)
+        .where(Document.id == document_id)
+    )
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return row.duplicate_of_id or row.id, row.page_count
+
+
+@router.get("/documents/{document_id}/pages", response_model=DocumentPagesResponse)
+async def get_document_pages(
+    document_id: PositiveInt,
+    start: int = Query(1, ge=1, description="First page to return (1-based)"),
+    limit: int = Query(1, ge=1, le=MAX_PAGES_PER_REQUEST, description="Number of pages to return"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get the extracted text of a range of pages."""
+    source_id, page_count = await _get_text_source(db, document_id)
+
+    result = await db.execute(
+        select(*PAGE_TEXT_COLUMNS)
+        .where(
+            DocumentPage.document_id == source_id,
+            DocumentPage.page_number >= start,
+            DocumentPage.page_number < start + limit,
+        )
+        .order_by(DocumentPage.page_number)
+    )
+    rows = result.all()
+    texts = await decode_pages(source_id, rows)
+
+    return DocumentPagesResponse(
+        document_id=document_id,
+        page_count=page_count,
+        pages=[
+            DocumentPageResponse(page_number=row.page_number, text=page_text)
+            for row, page_text in zip(rows, texts)
+        ],
+    )
+
+
+@router.get("/documents/{document_id}/text")
+async def stream_document_text(
+    document_id: PositiveInt,
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Stream the full extracted text as chunked text/plain, a batch of pages at a time.
+
+    Pages are read through a server-side cursor, so memory per request does
+    not grow with the size of the document.
+
+    Documents stored before page-level storage existed fall back to their
+    single content column.
+    """
+    source_id, _ = await _get_text_source(db, document_id)
+    session_factory = read_sessionmaker(request)
+
+    async def page_batches():
+        # The request's session is closed once the response starts, so use our own
+        async with session_factory() as stream_db:
+            # Server-side cursor: only TEXT_STREAM_BATCH_PAGES pages are in memory at once
+            result = await stream_db.stream(
+                select(*PAGE_TEXT_COLUMNS)
+                .where(DocumentPage.document_id == source_id)
+                .order_by(DocumentPage.page_number)
+                .execution_options(yield_per=TEXT_STREAM_BATCH_PAGES)
+            )
+            sent_any = False
+            async for rows in result.partitions():
+                sent_any = True
+                yield "".join(await decode_pages(source_id, rows))
+
+            if not sent_any:
+                yield await load_content(stream_db, source_id) or ""
+
+    return StreamingResponse(page_batches(), media_type="text/plain; charset=utf-8")
 
 
 @router.delete("/documents/{document_id}")
 async def delete_document(document_id: PositiveInt, db: AsyncSession = Depends(get_db)):
     result = await db.execute(
-        select(Document).where(Document.id == document_id)
+        select(Document.id, Document.filename).where(Document.id == document_id)
     )
-    document = result.scalar_one_or_none()
+    document = result.first()
 
     if not document:
         logger.warning(f"Attempted to delete non-existent document: ID={document_id}")
@@ -228,19 +643,78 @@ async def delete_document(document_id: PositiveInt, db: AsyncSession = Depends(g
 
     logger.info(f"Deleting document: ID={document_id}, filename={document.filename}")
 
-    await db.execute(
-        delete(document_tags).where(document_tags.c.document_id == document_id)
+    await delete_tag_links(db, document_tags.c.document_id == document_id)
+
+    # A still-queued upload keeps its PDF on disk until a worker picks it up
+    pending_result = await db.execute(
+        select(ProcessingStatus.file_path).where(
+            ProcessingStatus.document_id == document_id,
+            ProcessingStatus.file_path.is_not(None),
+        )
     )
+    pending_files = pending_result.scalars().all()
 
     await db.execute(
         delete(ProcessingStatus).where(ProcessingStatus.document_id == document_id)
     )
 
+    content_files = await _promote_duplicate(db, document_id)
+    content_files += await delete_pages(db, document_id)
+
     await db.execute(
         delete(Document).where(Document.id == document_id)
     )
 
     await db.commit()
+    invalidate_counts("documents")
+    await invalidate_documents([document_id])
+
+    for pending_file in pending_files + content_files:
+        if os.path.exists(pending_file):
+            os.remove(pending_file)
+
     logger.info(f"Successfully deleted document: ID={document_id}")
 
     return {"message": "Document deleted"}
+
+
+async def _promote_duplicate(db: AsyncSession, document_id: int) -> list[str]:
+    """
+    Hand the extracted text of a deleted original over to its oldest linked duplicate.
+
+    The promoted document becomes the new original and the remaining
+    duplicates are re-pointed to it. Pages are moved inside the database
+    (and a page file is linked under the heir's name); the heir's search
+    vector is rebuilt from the text, since it only covered its filename.
+
+    Returns:
+        Files to remove once the caller has committed
+    """
+    heir_result = await db.execute(
+        select(Document.id)
+        .where(Document.duplicate_of_id == document_id)
+        .order_by(Document.id)
+        .limit(1)
+    )
+    heir_id = heir_result.scalar_one_or_none()
+    if heir_id is None:
+        return []
+
+    await db.execute(
+        update(Document)
+        .where(Document.duplicate_of_id == document_id, Document.id != heir_id)
+        .values(duplicate_of_id=heir_id)
+    )
+    # Documents from before page-level storage keep their text in the content column
+    original_content = (
+        select(Document.content).where(Document.id == document_id).scalar_subquery()
+    )
+    await db.execute(
+        update(Document)
+        .where(Document.id == heir_id)
+        .values(content=original_content, duplicate_of_id=None)
+    )
+    await update_search_vectors(db, {heir_id: await load_content(db, document_id)})
+    moved_files = await move_pages(db, document_id, heir_id)
+    logger.info(f"Promoted document {heir_id} to original for deleted document {document_id}")
+    return moved_files
@@ -1,32 +1,243 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy import select
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import case, select, func, literal, or_, true
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import Select
 
-from app.database import get_db
-from app.models import Document
+from app.database import get_read_db, read_sessionmaker
+from app.models import Document, DocumentPage, SEARCH_CONFIG, SEARCH_MAX_INDEXED_CHARS
 from app.schemas import SearchResult
+from app.services.content_store import load_page_texts
+from app.services.tagging import TagMatch, build_tag_filter
 
 router = APIRouter()
 
 
-@router.get("/search")
-async def search_documents(q: str, db: AsyncSession = Depends(get_db)):
-    query = select(Document.id, Document.filename, Document.content).where(
-        Document.content.ilike(f"%{q}%")
+# Markers wrapped around matched terms in snippets
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+# Rows fetched per round trip from the server-side cursor when streaming
+STREAM_BATCH_SIZE = 100
+
+
+def _headline_options(fragments: int, fragment_words: int) -> str:
+    return (
+        f"MaxFragments={fragments}, MaxWords={fragment_words}, "
+        f"MinWords={max(fragment_words // 4, 1)}, FragmentDelimiter=\" ... \", "
+        f"StartSel=\"{HIGHLIGHT_START}\", StopSel=\"{HIGHLIGHT_STOP}\""
     )
+
+
+def _build_search_query(
+    q: str,
+    limit: int,
+    offset: int,
+    fragments: int,
+    fragment_words: int,
+    tag_filter: Optional[list] = None,
+) -> Select:
+    """
+    Build the ranked search query returning
+    (id, filename, snippet, rank, page_number, source_id, stored_page).
+
+    Matching runs against the GIN-indexed search_vector column, so cost follows
+    the number of hits rather than the size of the corpus. Snippets are built
+    with ts_headline in the database around the matched terms. Pages stored
+    compressed or in files have no text Postgres can read; for those the
+    snippet is NULL and stored_page names the page to build it from (see
+    _fill_stored_snippets).
+
+    tag_filter conditions (from build_tag_filter) apply to each returned
+    document, so a linked duplicate is filtered by its own tags.
+    """
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+
+    # Linked duplicates carry no text of their own; they are returned alongside
+    # the original whose vector matched. A duplicate's own vector (its filename)
+    # can match as well, so each document keeps only its best-ranked match, and
+    # its text always comes from the original.
+    source = aliased(Document)
+    rank = func.ts_rank_cd(source.search_vector, ts_query).label("rank")
+    matches = (
+        select(
+            Document.id.label("id"),
+            Document.filename.label("filename"),
+            func.coalesce(source.duplicate_of_id, source.id).label("source_id"),
+            rank,
+        )
+        .select_from(source)
+        .join(
+            Document,
+            or_(Document.id == source.id, Document.duplicate_of_id == source.id),
+        )
+        .where(source.search_vector.op("@@")(ts_query), *(tag_filter or []))
+        .distinct(Document.id)
+        .order_by(Document.id, rank.desc())
+        .subquery()
+    )
+    page = (
+        select(matches)
+        .order_by(matches.c.rank.desc(), matches.c.id)
+        .offset(offset)
+        .limit(limit)
+        .subquery()
+    )
+
+    # Best-matching page of each hit. Page vectors are only checked for the
+    # documents on this page of results, found through the primary key.
+    best_page = (
+        select(DocumentPage.page_number, DocumentPage.text)
+        .where(
+            DocumentPage.document_id == page.c.source_id,
+            DocumentPage.search_vector.op("@@")(ts_query),
+        )
+        .order_by(func.ts_rank_cd(DocumentPage.search_vector, ts_query).desc(), DocumentPage.page_number)
+        .limit(1)
+        .lateral()
+    )
+
+    # When no page matched (e.g. only the filename did), the snippet comes from
+    # the first page; documents stored before pages existed use their content
+    first_page = (
+        select(DocumentPage.page_number, DocumentPage.text)
+        .where(DocumentPage.document_id == page.c.source_id)
+        .order_by(DocumentPage.page_number)
+        .limit(1)
+        .lateral()
+    )
+
+    # Headlines are computed in an outer query so only the requested page pays
+    # for them
+    snippet_text = func.coalesce(
+        best_page.c.text,
+        first_page.c.text,
+        func.left(Document.content, SEARCH_MAX_INDEXED_CHARS),
+    )
+    snippet = func.ts_headline(SEARCH_CONFIG, snippet_text, ts_query, _headline_options(fragments, fragment_words))
+    stored_page = case(
+        (snippet_text.is_(None), func.coalesce(best_page.c.page_number, first_page.c.page_number)),
+    )
+    query = (
+        select(
+            page.c.id,
+            page.c.filename,
+            snippet,
+            page.c.rank,
+            best_page.c.page_number,
+            page.c.source_id,
+            stored_page,
+        )
+        .select_from(page)
+        .join(Document, Document.id == page.c.source_id)
+        .outerjoin(best_page, true())
+        .outerjoin(first_page, true())
+        .order_by(page.c.rank.desc(), page.c.id)
+    )
+    return query
+
+
+async def _fill_stored_snippets(
+    db: AsyncSession, rows: list, q: str, fragments: int, fragment_words: int
+) -> list[Optional[str]]:
+    """
+    Snippets of a batch of search rows, building those the query left NULL.
+
+    The page texts are read and decompressed here, then sent back for
+    ts_headline in a single statement, so snippets match the ones built
+    in the database for inline pages.
+    """
+    snippets = [row[2] for row in rows]
+    pending = [index for index, row in enumerate(rows) if row[6] is not None]
+    if not pending:
+        return snippets
+
+    texts = await load_page_texts(db, [(rows[index][5], rows[index][6]) for index in pending])
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    options = _headline_options(fragments, fragment_words)
+    headlines = (
+        await db.execute(
+            select(*(
+                func.ts_headline(
+                    SEARCH_CONFIG,
+                    literal(texts.get((rows[index][5], rows[index][6]), "")[:SEARCH_MAX_INDEXED_CHARS]),
+                    ts_query,
+                    options,
+                )
+                for index in pending
+            ))
+        )
+    ).one()
+    for index, headline in zip(pending, headlines):
+        snippets[index] = headline
+    return snippets
+
+
+def _to_search_result(row, snippet: Optional[str]) -> SearchResult:
+    return SearchResult(
+        id=row[0],
+        filename=row[1],
+        snippet=snippet or "",
+        rank=row[3],
+        page_number=row[4],
+    )
+
+
+@router.get("/search", response_model=List[SearchResult])
+async def search_documents(
+    q: str = Query(..., min_length=1, description="Search query (web search syntax: quotes, OR, -term)"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results to return"),
+    tag: List[str] = Query([], description="Only documents with this tag; repeat for several tags"),
+    tag_match: TagMatch = Query(TagMatch.all, description="Documents must have all (AND) or any (OR) of the tags"),
+    exclude_tag: List[str] = Query([], description="Leave out documents with this tag; repeatable (NOT)"),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
+    fragments: int = Query(2, ge=1, le=5, description="Number of highlighted fragments per snippet"),
+    fragment_words: int = Query(20, ge=5, le=60, description="Maximum words per fragment"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Full-text search over document filenames and content, best matches first."""
+    tag_filter = await build_tag_filter(db, Document.id, tag, tag_match, exclude_tag)
+    query = _build_search_query(q, limit, offset, fragments, fragment_words, tag_filter)
     result = await db.execute(query)
     rows = result.fetchall()
+    snippets = await _fill_stored_snippets(db, rows, q, fragments, fragment_words)
+    return [_to_search_result(row, snippet) for row, snippet in zip(rows, snippets)]
 
-    results = []
-    for row in rows:
-        content = row[2] or ""
-        snippet = content[:200] + "..." if len(content) > 200 else content
-        results.append(
-            SearchResult(
-                id=row[0],
-                filename=row[1],
-                snippet=snippet,
-            )
-        )
 
-    return results
+@router.get("/search/stream")
+async def stream_search_results(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Search query (web search syntax: quotes, OR, -term)"),
+    limit: int = Query(1000, ge=1, le=10000, description="Maximum number of results to return"),
+    tag: List[str] = Query([], description="Only documents with this tag; repeat for several tags"),
+    tag_match: TagMatch = Query(TagMatch.all, description="Documents must have all (AND) or any (OR) of the tags"),
+    exclude_tag: List[str] = Query([], description="Leave out documents with this tag; repeatable (NOT)"),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
+    fragments: int = Query(2, ge=1, le=5, description="Number of highlighted fragments per snippet"),
+    fragment_words: int = Query(20, ge=5, le=60, description="Maximum words per fragment"),
+):
+    """
+    Same search as /search, streamed as NDJSON (one SearchResult per line).
+
+    Rows are read from a server-side cursor in batches of STREAM_BATCH_SIZE,
+    so memory per request stays bounded however many results are requested.
+    """
+    session_factory = read_sessionmaker(request)
+
+    async def ndjson_lines():
+        # The response outlives the request's dependencies, so the stream owns its session
+        async with session_factory() as db:
+            tag_filter = await build_tag_filter(db, Document.id, tag, tag_match, exclude_tag)
+            query = _build_search_query(q, limit, offset, fragments, fragment_words, tag_filter)
+            result = await db.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+            async for rows in result.partitions():
+                snippets = await _fill_stored_snippets(db, rows, q, fragments, fragment_words)
+                yield "".join(
+                    _to_search_result(row, snippet).model_dump_json() + "\n"
+                    for row, snippet in zip(rows, snippets)
+                )
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
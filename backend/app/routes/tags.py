@@ -1,18 +1,65 @@
 import logging
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from pydantic import PositiveInt
-from sqlalchemy import select, delete, func
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import PositiveInt, TypeAdapter
+from sqlalchemy import select, delete, func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.models import Document, Tag
-from app.schemas import TagResponse, TagCreate, PaginatedResponse
+from app.config import settings
+from app.database import get_db, get_read_db
+from app.models import Document, Tag, document_tags
+from app.schemas import (
+    DocumentTagResponse,
+    TagResponse,
+    TagCreate,
+    TagFacet,
+    PaginatedResponse,
+    BulkTagRequest,
+    BulkTagResponse,
+)
+from app.services.pagination import encode_cursor, decode_cursor
+from app.services.counting import CountStrategy, count_rows, invalidate_counts
+from app.services.response_cache import (
+    cache_response,
+    document_tags_cache_key,
+    get_cached_response,
+    invalidate_documents,
+)
+from app.services.tag_autocomplete import suggest_tags, invalidate_tag_suggestions
+from app.services.tagging import (
+    normalize_tag_names,
+    ensure_tags,
+    get_tags,
+    find_missing_documents,
+    attach_tags,
+    detach_tags,
+    delete_tag_links,
+    TagMatch,
+    build_tag_filter,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+_DOCUMENT_TAG_LIST = TypeAdapter(List[DocumentTagResponse])
+
+
+async def _ensure_document_exists(db: AsyncSession, document_id: int) -> None:
+    """404 unless the document exists. Selects only the id, never the document text."""
+    result = await db.execute(select(Document.id).where(Document.id == document_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+
+def _to_tag_response(tag: Tag) -> TagResponse:
+    return TagResponse(
+        id=tag.id,
+        name=tag.name,
+        created_at=tag.created_at,
+        document_count=tag.document_count
+    )
+
 
 @router.post("/documents/{document_id}/tags", response_model=TagResponse)
 async def add_tag_to_document(
@@ -21,49 +68,121 @@ async def add_tag_to_document(
     db: AsyncSession = Depends(get_db)
 ):
     """Add a tag to a document. Creates the tag if it doesn't exist."""
-    from sqlalchemy.orm import selectinload
+    await _ensure_document_exists(db, document_id)
 
-    result = await db.execute(
-        select(Document)
-        .options(selectinload(Document.tags))
-        .where(Document.id == document_id)
-    )
-    document = result.scalar_one_or_none()
+    tag_names = normalize_tag_names([tag_data.name])
+    if not tag_names:
+        raise HTTPException(status_code=400, detail="Tag name cannot be empty")
 
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
+    created = await ensure_tags(db, tag_names)
+    added = await attach_tags(db, [document_id], tag_names)
+    tag = (await get_tags(db, tag_names))[0]
+    await db.commit()
 
-    tag_name = tag_data.name.lower().strip()
+    if created:
+        invalidate_counts("tags")
+        invalidate_tag_suggestions()
+        logger.info(f"Created new tag: {tag.name}")
+
+    if added:
+        invalidate_counts("documents")
+        await invalidate_documents([document_id])
+        logger.info(f"Added tag '{tag.name}' to document {document_id}")
+    else:
+        logger.info(f"Tag {tag.name} already associated with document {document_id}")
+
+    return _to_tag_response(tag)
+
+
+def _validate_bulk_request(request: BulkTagRequest) -> tuple[list[int], list[str]]:
+    """Deduplicate and bound a bulk request. Returns (document_ids, tag_names)."""
+    document_ids = sorted(set(request.document_ids))
+    tag_names = normalize_tag_names(request.tags)
+
+    if not document_ids:
+        raise HTTPException(status_code=400, detail="No document ids provided")
+    if not tag_names:
+        raise HTTPException(status_code=400, detail="No tag names provided")
+    if any(document_id <= 0 for document_id in document_ids):
+        raise HTTPException(status_code=400, detail="Document ids must be positive integers")
+    if len(document_ids) > settings.MAX_BULK_TAG_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many documents. Maximum per request is {settings.MAX_BULK_TAG_DOCUMENTS}"
+        )
+    if len(tag_names) > settings.MAX_BULK_TAGS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many tags. Maximum per request is {settings.MAX_BULK_TAGS}"
+        )
 
-    if not tag_name:
-        raise HTTPException(status_code=400, detail="Tag name cannot be empty")
+    return document_ids, tag_names
 
-    tag_result = await db.execute(select(Tag).where(Tag.name == tag_name))
-    tag = tag_result.scalar_one_or_none()
 
-    if not tag:
-        tag = Tag(name=tag_name)
-        db.add(tag)
-        await db.flush()
-        logger.info(f"Created new tag: {tag_name}")
-
-    if tag in document.tags:
-        logger.info(f"Tag {tag_name} already associated with document {document_id}")
-        return TagResponse(
-            id=tag.id,
-            name=tag.name,
-            created_at=tag.created_at
-        )
+@router.post("/tags/bulk/attach", response_model=BulkTagResponse)
+async def bulk_attach_tags(
+    request: BulkTagRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Add every listed tag to every listed document in one transaction.
+
+    Missing tags are created. Links that already exist are left alone, and
+    document ids that do not exist are reported instead of failing the request.
+    """
+    document_ids, tag_names = _validate_bulk_request(request)
+
+    missing = await find_missing_documents(db, document_ids)
+    created = await ensure_tags(db, tag_names)
+    added = await attach_tags(db, document_ids, tag_names)
+    tags = await get_tags(db, tag_names)
+    await db.commit()
+
+    invalidate_counts("documents")
+    await invalidate_documents(document_ids)
+    if created:
+        invalidate_counts("tags")
+        invalidate_tag_suggestions()
+
+    logger.info(
+        f"Bulk attach: {len(tags)} tag(s) x {len(document_ids) - len(missing)} document(s), "
+        f"{added} new link(s)"
+    )
+    return BulkTagResponse(
+        tags=[_to_tag_response(tag) for tag in tags],
+        changed=added,
+        missing_document_ids=missing,
+    )
+
+
+@router.post("/tags/bulk/detach", response_model=BulkTagResponse)
+async def bulk_detach_tags(
+    request: BulkTagRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Remove every listed tag from every listed document in one transaction.
 
-    document.tags.append(tag)
+    Tags themselves are kept, even when no document uses them anymore.
+    """
+    document_ids, tag_names = _validate_bulk_request(request)
+
+    missing = await find_missing_documents(db, document_ids)
+    removed = await detach_tags(db, document_ids, tag_names)
+    tags = await get_tags(db, tag_names)
     await db.commit()
-    await db.refresh(tag)
 
-    logger.info(f"Added tag '{tag_name}' to document {document_id}")
-    return TagResponse(
-        id=tag.id,
-        name=tag.name,
-        created_at=tag.created_at
+    invalidate_counts("documents")
+    await invalidate_documents(document_ids)
+
+    logger.info(
+        f"Bulk detach: {len(tags)} tag(s) x {len(document_ids) - len(missing)} document(s), "
+        f"{removed} link(s) removed"
+    )
+    return BulkTagResponse(
+        tags=[_to_tag_response(tag) for tag in tags],
+        changed=removed,
+        missing_document_ids=missing,
     )
 
 
@@ -74,56 +193,55 @@ async def remove_tag_from_document(
     db: AsyncSession = Depends(get_db)
 ):
     """Remove a tag from a document."""
-    from sqlalchemy.orm import selectinload
-
-    result = await db.execute(
-        select(Document)
-        .options(selectinload(Document.tags))
-        .where(Document.id == document_id)
-    )
-    document = result.scalar_one_or_none()
+    await _ensure_document_exists(db, document_id)
 
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
-
-    tag_result = await db.execute(select(Tag).where(Tag.id == tag_id))
-    tag = tag_result.scalar_one_or_none()
-
-    if not tag:
+    tag_result = await db.execute(select(Tag.id).where(Tag.id == tag_id))
+    if tag_result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="Tag not found")
 
-    if tag not in document.tags:
+    removed = await delete_tag_links(
+        db,
+        document_tags.c.document_id == document_id,
+        document_tags.c.tag_id == tag_id,
+    )
+    if removed == 0:
         raise HTTPException(
             status_code=400,
             detail=f"Tag {tag_id} is not associated with document {document_id}"
         )
 
-    document.tags.remove(tag)
     await db.commit()
+    invalidate_counts("documents")
+    await invalidate_documents([document_id])
 
     logger.info(f"Removed tag {tag_id} from document {document_id}")
     return {"message": "Tag removed from document"}
 
 
-@router.get("/documents/{document_id}/tags", response_model=List[TagResponse])
+@router.get("/documents/{document_id}/tags", response_model=List[DocumentTagResponse])
 async def get_document_tags(
     document_id: PositiveInt,
-    db: AsyncSession = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all tags for a document."""
-    from sqlalchemy.orm import selectinload
+    """Get all tags for a document, from the response cache when possible (ETag / 304)."""
+    cache_key = document_tags_cache_key(document_id)
+    cached = await get_cached_response(cache_key)
+    if cached is not None:
+        return cached.to_response(request)
+
+    await _ensure_document_exists(db, document_id)
 
     result = await db.execute(
-        select(Document)
-        .options(selectinload(Document.tags))
-        .where(Document.id == document_id)
+        select(Tag)
+        .join(document_tags, document_tags.c.tag_id == Tag.id)
+        .where(document_tags.c.document_id == document_id)
+        .order_by(Tag.name)
     )
-    document = result.scalar_one_or_none()
 
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
-
-    return [TagResponse(id=tag.id, name=tag.name, created_at=tag.created_at) for tag in document.tags]
+    tags = [DocumentTagResponse.model_validate(tag) for tag in result.scalars().all()]
+    entry = await cache_response(cache_key, _DOCUMENT_TAG_LIST.dump_json(tags))
+    return entry.to_response(request)
 
 
 @router.get("/tags", response_model=PaginatedResponse[TagResponse])
@@ -131,68 +249,147 @@ async def list_all_tags(
     skip: int = Query(0, ge=0, description="Number of tags to skip"),
     limit: int = Query(5, ge=1, le=1000, description="Maximum number of tags to return"),
     search: Optional[str] = Query(None, description="Search tags by name (case-insensitive)"),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from a previous page"),
+    count: CountStrategy = Query(CountStrategy.exact, description="How to compute total: exact, estimated or none"),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all available tags with pagination, optionally filtered by search query."""
-    count_query = select(func.count(Tag.id))
-    if search and search.strip():
-        search_term = search.lower().strip()
-        count_query = count_query.where(Tag.name.ilike(f"%{search_term}%"))
+    """
+    Get all available tags with pagination, optionally filtered by search query.
+
+    Tags are ordered by (name, id). Passing back next_cursor pages by keyset
+    instead of OFFSET.
+    """
+    if cursor and skip:
+        raise HTTPException(status_code=400, detail="skip cannot be combined with cursor")
 
-    total_result = await db.execute(count_query)
-    total = total_result.scalar_one()
+    search_term = search.lower().strip() if search and search.strip() else None
 
+    matched = select(Tag.id)
     query = select(Tag)
 
-    if search and search.strip():
-        search_term = search.lower().strip()
+    if search_term:
+        matched = matched.where(Tag.name.ilike(f"%{search_term}%"))
         query = query.where(Tag.name.ilike(f"%{search_term}%"))
 
-    query = query.order_by(Tag.name).offset(skip).limit(limit)
+    total, total_is_estimate = await count_rows(db, matched, count, ("tags", search_term))
+
+    if cursor:
+        try:
+            last_name, last_id = decode_cursor(cursor, str, int)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(tuple_(Tag.name, Tag.id) > tuple_(last_name, last_id))
+
+    # One extra row tells us whether another page exists without counting
+    query = query.order_by(Tag.name, Tag.id).offset(skip).limit(limit + 1)
     result = await db.execute(query)
     tags = result.scalars().all()
 
-    items = [TagResponse(id=tag.id, name=tag.name, created_at=tag.created_at) for tag in tags]
+    has_next = len(tags) > limit
+    tags = tags[:limit]
+    next_cursor = encode_cursor(tags[-1].name, tags[-1].id) if has_next else None
+
+    items = [_to_tag_response(tag) for tag in tags]
 
     return PaginatedResponse(
         items=items,
         total=total,
         skip=skip,
         limit=limit,
-        has_next=(skip + limit) < total,
-        has_prev=skip > 0,
+        has_next=has_next,
+        has_prev=skip > 0 or cursor is not None,
+        next_cursor=next_cursor,
+        total_is_estimate=total_is_estimate,
     )
 
 
+@router.get("/tags/autocomplete", response_model=List[TagResponse])
+async def autocomplete_tags(
+    q: str = Query(..., min_length=1, max_length=100, description="Text typed so far"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Tag suggestions for a partially typed name: prefix matches first, then
+    other names containing the text, each ordered by how many documents use
+    the tag. Answers come from an in-process cache when possible.
+    """
+    return await suggest_tags(db, q, limit)
+
+
+@router.get("/tags/facets", response_model=List[TagFacet])
+async def get_tag_facets(
+    limit: int = Query(10, ge=1, le=100, description="Number of tags to return"),
+    tag: List[str] = Query([], description="Current filter: tag name; repeat for several tags"),
+    tag_match: TagMatch = Query(TagMatch.all, description="Current filter: all (AND) or any (OR) of the tags"),
+    exclude_tag: List[str] = Query([], description="Current filter: excluded tag name; repeatable (NOT)"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Most used tags with their document counts, for the documents matching the
+    same tag filter as GET /documents.
+
+    Without a filter the counts come straight from Tag.document_count through
+    idx_tag_document_count, with no GROUP BY over document_tags. With a filter
+    only the links of the matching documents are grouped.
+    """
+    tag_filter = await build_tag_filter(db, Document.id, tag, tag_match, exclude_tag)
+
+    if not tag_filter:
+        result = await db.execute(
+            select(Tag.id, Tag.name, Tag.document_count)
+            .where(Tag.document_count > 0)
+            .order_by(Tag.document_count.desc(), Tag.name)
+            .limit(limit)
+        )
+    else:
+        document_count = func.count().label("document_count")
+        result = await db.execute(
+            select(Tag.id, Tag.name, document_count)
+            .join(document_tags, document_tags.c.tag_id == Tag.id)
+            .where(document_tags.c.document_id.in_(select(Document.id).where(*tag_filter)))
+            .group_by(Tag.id, Tag.name)
+            .order_by(document_count.desc(), Tag.name)
+            .limit(limit)
+        )
+
+    return [
+        TagFacet(id=row.id, name=row.name, document_count=row.document_count)
+        for row in result
+    ]
+
+
 @router.delete("/tags/{tag_id}")
 async def delete_tag(
     tag_id: PositiveInt,
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a tag from the system. This will remove the tag from all documents."""
-    from sqlalchemy.orm import selectinload
-    from app.models import document_tags
-
-    result = await db.execute(
-        select(Tag)
-        .options(selectinload(Tag.documents))
-        .where(Tag.id == tag_id)
-    )
+    result = await db.execute(select(Tag).where(Tag.id == tag_id))
     tag = result.scalar_one_or_none()
 
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
 
-    document_count = len(tag.documents) if tag.documents else 0
+    # The maintained counter replaces counting (or loading) every tagged document
+    document_count = tag.document_count
 
     logger.info(f"Deleting tag {tag_id} ({tag.name}) from {document_count} document(s)")
 
-    await db.execute(
-        delete(document_tags).where(document_tags.c.tag_id == tag_id)
+    # The ids tell which cached document responses listed the tag
+    unlinked = await db.execute(
+        delete(document_tags)
+        .where(document_tags.c.tag_id == tag_id)
+        .returning(document_tags.c.document_id)
     )
+    document_ids = unlinked.scalars().all()
 
     await db.execute(delete(Tag).where(Tag.id == tag_id))
     await db.commit()
+    invalidate_counts("documents")
+    invalidate_counts("tags")
+    invalidate_tag_suggestions()
+    await invalidate_documents(document_ids)
 
     logger.info(f"Successfully deleted tag {tag_id}")
     return {
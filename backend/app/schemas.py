@@ -17,7 +17,9 @@ class TagBase(BaseModel):
     name: str
 
 
-class TagResponse(TagBase):
+# A tag as listed on a document. No document_count: these lists are cached
+# per document, and the count changes whenever any other document is tagged.
+class DocumentTagResponse(TagBase):
     id: int
     created_at: datetime
 
@@ -25,13 +27,17 @@ class TagResponse(TagBase):
         from_attributes = True
 
 
+class TagResponse(DocumentTagResponse):
+    document_count: int = 0
+
+
 class DocumentResponse(DocumentBase):
     id: int
     file_size: Optional[int] = None
     page_count: Optional[int] = None
     status: str
     created_at: datetime
-    tags: List[TagResponse] = []
+    tags: List[DocumentTagResponse] = []
 
     class Config:
         from_attributes = True
@@ -41,20 +47,98 @@ class DocumentDetail(DocumentResponse):
     content: Optional[str] = None
 
 
+class BatchUploadResult(BaseModel):
+    filename: str
+    # completed, queued, duplicate or failed
+    status: str
+    id: Optional[int] = None
+    duplicate_of: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BatchUploadResponse(BaseModel):
+    results: List[BatchUploadResult]
+    succeeded: int
+    failed: int
+
+
+class DocumentPageResponse(BaseModel):
+    page_number: int
+    text: str
+
+
+class DocumentPagesResponse(BaseModel):
+    document_id: int
+    page_count: Optional[int] = None
+    pages: List[DocumentPageResponse]
+
+
 class SearchResult(BaseModel):
     id: int
     filename: str
     snippet: str
+    rank: Optional[float] = None
+    # Best-matching page, when page-level text is available
+    page_number: Optional[int] = None
 
 
 class TagCreate(TagBase):
     pass
 
 
+class TagFacet(BaseModel):
+    id: int
+    name: str
+    # Documents carrying the tag within the current filter
+    document_count: int
+
+
+class BulkTagRequest(BaseModel):
+    document_ids: List[int]
+    tags: List[str]
+
+
+class BulkTagResponse(BaseModel):
+    tags: List[TagResponse]
+    # Links actually inserted or deleted; already-present (or absent) links are not counted
+    changed: int
+    missing_document_ids: List[int] = []
+
+
+class ProfileSummary(BaseModel):
+    id: str
+    method: str
+    path: str
+    query: str = ""
+    route: Optional[str] = None
+    status_code: int
+    # "header" or "sampled"
+    reason: str
+    started_at: datetime
+    duration: float
+    sql_count: int
+    sql_seconds: float
+
+
+class ProfiledStatement(BaseModel):
+    statement: str
+    seconds: float
+
+
+class ProfileDetail(ProfileSummary):
+    statements: List[ProfiledStatement]
+    # pstats output, functions sorted by cumulative time
+    stats: str
+
+
 class PaginatedResponse(BaseModel, Generic[T]):
     items: List[T]
-    total: int
+    # None when the caller asked for count=none
+    total: Optional[int] = None
+    total_is_estimate: bool = False
     skip: int
     limit: int
     has_next: bool
     has_prev: bool
+    # Pass back as ?cursor= to fetch the next page by keyset instead of offset
+    next_cursor: Optional[str] = None
@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import Document, ProcessingStatus
+from app.services.content_store import load_contents, update_search_vectors
+from app.services.metrics import UPLOAD_FILES, UPLOAD_STAGE_DURATION
+from app.services.page_store import copy_pages, store_many_pages
+from app.services.pdf_processor import extract_pages_from_pdf
+
+logger = logging.getLogger(__name__)
+
+
+async def _find_originals(db: AsyncSession, checksums: list[str]) -> dict:
+    """Map each already-extracted content hash to its original's (id, page_count) row."""
+    if settings.DEDUP_MODE == "off" or not checksums:
+        return {}
+    result = await db.execute(
+        select(Document.content_hash, Document.id, Document.page_count)
+        .where(
+            Document.content_hash.in_(set(checksums)),
+            Document.duplicate_of_id.is_(None),
+            Document.page_count.is_not(None),
+        )
+        .order_by(Document.id)
+    )
+    originals = {}
+    for row in result:
+        originals.setdefault(row.content_hash, row)
+    return originals
+
+
+async def _extract_all(items: list[dict]) -> None:
+    """Extract every item in parallel on the extraction pool, recording pages or the error."""
+    outcomes = await asyncio.gather(
+        *(extract_pages_from_pdf(item["file_path"]) for item in items),
+        return_exceptions=True,
+    )
+    for item, outcome in zip(items, outcomes):
+        if isinstance(outcome, BaseException):
+            item["error"] = f"Failed to process PDF: {str(outcome)}"
+        else:
+            item["pages"], item["page_count"] = outcome
+
+
+async def _insert_documents(db: AsyncSession, items: list[dict], rows: list[dict]) -> None:
+    """Bulk-insert document rows with INSERT ... RETURNING and record each new id on its item."""
+    if not rows:
+        return
+    result = await db.execute(
+        insert(Document).returning(Document.id, sort_by_parameter_order=True),
+        rows,
+    )
+    for item, document_id in zip(items, result.scalars().all()):
+        item["id"] = document_id
+
+
+async def ingest_batch(db: AsyncSession, items: list[dict]) -> None:
+    """
+    Store a batch of received uploads with a handful of bulk statements and one commit.
+
+    Each item is a dict with filename, file_path, file_size and checksum. On
+    return every item has either an "id" and a "status" (completed, queued or
+    duplicate) or an "error".
+
+    Files already known by hash (or repeated within the batch, in sync mode)
+    are stored as duplicates without parsing. New files are extracted in
+    parallel in sync mode, or recorded as queued jobs in async mode.
+
+    Upload metrics are recorded as for single uploads: one outcome per file
+    once the batch is committed, and each stage timed once for the batch.
+    """
+    is_async = settings.INGEST_MODE == "async"
+    if settings.DEDUP_MODE != "off":
+        with UPLOAD_STAGE_DURATION.time(stage="dedup_lookup"):
+            originals = await _find_originals(db, [item["checksum"] for item in items])
+    else:
+        originals = {}
+
+    new_items, duplicate_items, leaders = [], [], {}
+    for item in items:
+        checksum = item["checksum"]
+        if checksum in originals:
+            item["source"] = originals[checksum]
+            duplicate_items.append(item)
+        elif settings.DEDUP_MODE != "off" and not is_async and checksum in leaders:
+            # Repeated inside the batch: reuse the first copy's extraction
+            item["leader"] = leaders[checksum]
+            duplicate_items.append(item)
+        else:
+            leaders.setdefault(checksum, item)
+            new_items.append(item)
+
+    if not is_async and new_items:
+        with UPLOAD_STAGE_DURATION.time(stage="extract"):
+            await _extract_all(new_items)
+
+    with UPLOAD_STAGE_DURATION.time(stage="db_commit"):
+        await _store_batch(db, new_items, duplicate_items, is_async)
+
+    outcomes = Counter("failed" if "error" in item else item["status"] for item in items)
+    for outcome, count in outcomes.items():
+        UPLOAD_FILES.inc(count, outcome=outcome)
+
+    # Sync mode is done with the files; async workers still need theirs
+    for item in items:
+        if not is_async or "error" in item or item.get("status") == "duplicate":
+            if os.path.exists(item["file_path"]):
+                os.remove(item["file_path"])
+
+    logger.info(
+        f"Batch stored: {outcomes['completed'] + outcomes['queued']} new, "
+        f"{outcomes['duplicate']} duplicate, {outcomes['failed']} failed"
+    )
+
+
+async def _store_batch(
+    db: AsyncSession,
+    new_items: list[dict],
+    duplicate_items: list[dict],
+    is_async: bool,
+) -> None:
+    """Write the batch's documents, jobs, pages and search vectors and commit."""
+    now = datetime.utcnow()
+
+    stored = [item for item in new_items if "error" not in item]
+    await _insert_documents(db, stored, [
+        {
+            "filename": item["filename"],
+            "file_size": item["file_size"],
+            "content_hash": item["checksum"],
+            "page_count": item.get("page_count"),
+        }
+        for item in stored
+    ])
+
+    # Text (or None while queued) by new document id, stored once all rows exist
+    contents = {}
+    status_rows = []
+    # Extracted pages by document id, for the new documents and in-batch copies
+    pages = {}
+    for item in stored:
+        contents[item["id"]] = None if is_async else "".join(item["pages"])
+        if is_async:
+            item["status"] = "queued"
+            status_rows.append({
+                "document_id": item["id"],
+                "status": "queued",
+                "file_path": item["file_path"],
+                "attempts": 0,
+            })
+        else:
+            item["status"] = "completed"
+            status_rows.append({"document_id": item["id"], "status": "completed", "processed_at": now})
+            pages[item["id"]] = item["pages"]
+
+    # Duplicates, now that in-batch leaders have ids
+    linked = []
+    for item in duplicate_items:
+        leader = item.get("leader")
+        if leader is not None and "error" in leader:
+            item["error"] = leader["error"]
+            continue
+        if leader is not None:
+            item["duplicate_of"] = leader["id"]
+            item["page_count"] = leader["page_count"]
+        else:
+            item["duplicate_of"] = item["source"].id
+            item["page_count"] = item["source"].page_count
+        linked.append(item)
+
+    copy_mode = settings.DEDUP_MODE == "copy"
+    existing_content = {}
+    if copy_mode:
+        source_ids = [item["source"].id for item in linked if "source" in item]
+        if source_ids:
+            existing_content = await load_contents(db, source_ids)
+
+    duplicate_rows = []
+    for item in linked:
+        row = {
+            "filename": item["filename"],
+            "file_size": item["file_size"],
+            "content_hash": item["checksum"],
+            "page_count": item["page_count"],
+        }
+        if not copy_mode:
+            row["duplicate_of_id"] = item["duplicate_of"]
+        duplicate_rows.append(row)
+    await _insert_documents(db, linked, duplicate_rows)
+
+    for item in linked:
+        item["status"] = "duplicate"
+        if not copy_mode:
+            contents[item["id"]] = None
+        elif "leader" in item:
+            contents[item["id"]] = contents[item["leader"]["id"]]
+        else:
+            contents[item["id"]] = existing_content.get(item["duplicate_of"])
+        status_rows.append({"document_id": item["id"], "status": "completed", "processed_at": now})
+        if copy_mode and "leader" in item:
+            pages[item["id"]] = item["leader"]["pages"]
+
+    if status_rows:
+        await db.execute(insert(ProcessingStatus), status_rows)
+    await store_many_pages(db, pages)
+    await update_search_vectors(db, contents)
+    if copy_mode:
+        for item in linked:
+            if "source" in item:
+                await copy_pages(db, item["source"].id, item["id"])
+
+    await db.commit()
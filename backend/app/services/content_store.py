@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import os
+import shutil
+from itertools import groupby
+from typing import Optional
+
+import zstandard
+from sqlalchemy import bindparam, func, literal_column, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import Document, DocumentPage, SEARCH_CONFIG, SEARCH_MAX_INDEXED_CHARS
+
+logger = logging.getLogger(__name__)
+
+# Texts above this many characters are (de)compressed in a thread, off the event loop
+THREAD_THRESHOLD_CHARS = 256 * 1024
+
+# Columns describing where a page's text is stored
+PAGE_TEXT_COLUMNS = (
+    DocumentPage.page_number,
+    DocumentPage.text,
+    DocumentPage.data,
+    DocumentPage.data_offset,
+    DocumentPage.data_length,
+)
+
+
+def compress_text(text: str) -> bytes:
+    """zstd-compress UTF-8 text at CONTENT_COMPRESSION_LEVEL."""
+    return zstandard.ZstdCompressor(level=settings.CONTENT_COMPRESSION_LEVEL).compress(text.encode("utf-8"))
+
+
+def decompress_text(data: bytes) -> str:
+    return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+
+
+async def _run(size: int, function, *args):
+    if size > THREAD_THRESHOLD_CHARS:
+        return await asyncio.to_thread(function, *args)
+    return function(*args)
+
+
+def content_file_path(document_id: int) -> str:
+    """Page file of a document in CONTENT_STORAGE=file, sharded so no directory grows unbounded."""
+    return os.path.join(settings.CONTENT_STORE_DIR, f"{document_id % 1000:03d}", f"{document_id}.zst")
+
+
+def _compress_pages(pages: list[str]) -> list[bytes]:
+    return [compress_text(page_text) for page_text in pages]
+
+
+def _append_frames(path: str, frames: list[bytes]) -> int:
+    """Append zstd frames to a page file and return the offset of the first one."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as f:
+        offset = f.tell()
+        for frame in frames:
+            f.write(frame)
+    return offset
+
+
+def _read_frames(path: str, ranges: list[tuple[int, int]]) -> list[Optional[bytes]]:
+    try:
+        with open(path, "rb") as f:
+            frames = []
+            for offset, length in ranges:
+                f.seek(offset)
+                frames.append(f.read(length))
+            return frames
+    except FileNotFoundError:
+        logger.error(f"Content file missing: {path}")
+        return [None] * len(ranges)
+
+
+def _link_or_copy(source: str, target: str) -> None:
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def reset_page_file(document_id: int) -> None:
+    """Drop a page file left by an earlier, rolled-back extraction of this document."""
+    path = content_file_path(document_id)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+async def encode_pages(document_id: int, pages: list[str], first_page_number: int = 1) -> list[dict]:
+    """
+    Build document_pages values for a document's pages, storing the text per CONTENT_STORAGE.
+
+    With "inline" the text goes into document_pages.text; with "compressed"
+    each page becomes a zstd blob in document_pages.data; with "file" the
+    pages are appended as zstd frames to one file per document under
+    CONTENT_STORE_DIR, and each row keeps its frame's offset and length.
+    Every row also carries search_text, the part of the page that is indexed.
+
+    Files are written straight away, before the caller commits, so a
+    rolled-back transaction can leave a page file behind; it is replaced
+    when the document is extracted again (see reset_page_file).
+    """
+    mode = settings.CONTENT_STORAGE
+    rows = [
+        {
+            "document_id": document_id,
+            "page_number": page_number,
+            "text": page_text if mode == "inline" else None,
+            "data": None,
+            "data_offset": None,
+            "data_length": None,
+            "search_text": page_text[:SEARCH_MAX_INDEXED_CHARS],
+        }
+        for page_number, page_text in enumerate(pages, start=first_page_number)
+    ]
+    if mode == "inline" or not pages:
+        return rows
+
+    size = sum(len(page_text) for page_text in pages)
+    frames = await _run(size, _compress_pages, pages)
+    if mode == "compressed":
+        for row, frame in zip(rows, frames):
+            row["data"] = frame
+    else:
+        offset = await _run(size, _append_frames, content_file_path(document_id), frames)
+        for row, frame in zip(rows, frames):
+            row["data_offset"] = offset
+            row["data_length"] = len(frame)
+            offset += len(frame)
+    return rows
+
+
+async def decode_pages(document_id: int, rows) -> list[str]:
+    """
+    Texts of page rows selected with PAGE_TEXT_COLUMNS, whichever way they were stored.
+
+    Rows keep the storage they were written with, so changing CONTENT_STORAGE
+    does not require migrating existing documents.
+    """
+    texts: list[Optional[str]] = [row.text for row in rows]
+    frames: dict[int, bytes] = {}
+    for index, row in enumerate(rows):
+        if row.data is not None:
+            frames[index] = row.data
+
+    file_rows = [index for index, row in enumerate(rows) if row.data_offset is not None]
+    if file_rows:
+        ranges = [(rows[index].data_offset, rows[index].data_length) for index in file_rows]
+        read = await asyncio.to_thread(_read_frames, content_file_path(document_id), ranges)
+        for index, frame in zip(file_rows, read):
+            if frame is not None:
+                frames[index] = frame
+
+    size = sum(len(frame) for frame in frames.values()) * 4
+    decoded = await _run(size, lambda: {index: decompress_text(frame) for index, frame in frames.items()})
+    for index, page_text in decoded.items():
+        texts[index] = page_text
+    return [page_text or "" for page_text in texts]
+
+
+async def load_page_texts(db: AsyncSession, pages: list[tuple[int, int]]) -> dict[tuple[int, int], str]:
+    """Text of the given (document_id, page_number) pages, read in one query."""
+    if not pages:
+        return {}
+    result = await db.execute(
+        select(DocumentPage.document_id, *PAGE_TEXT_COLUMNS)
+        .where(tuple_(DocumentPage.document_id, DocumentPage.page_number).in_(set(pages)))
+        .order_by(DocumentPage.document_id, DocumentPage.page_number)
+    )
+    texts = {}
+    for document_id, rows in groupby(result.all(), key=lambda row: row.document_id):
+        rows = list(rows)
+        for row, page_text in zip(rows, await decode_pages(document_id, rows)):
+            texts[(document_id, row.page_number)] = page_text
+    return texts
+
+
+async def load_contents(db: AsyncSession, document_ids: list[int]) -> dict[int, Optional[str]]:
+    """
+    Return the full extracted text of each document, joined from its pages.
+
+    Documents stored before page-level storage existed have no pages and
+    are read from documents.content. Linked duplicates (and documents not
+    yet extracted) map to None.
+    """
+    if not document_ids:
+        return {}
+
+    result = await db.execute(
+        select(DocumentPage.document_id, *PAGE_TEXT_COLUMNS)
+        .where(DocumentPage.document_id.in_(set(document_ids)))
+        .order_by(DocumentPage.document_id, DocumentPage.page_number)
+    )
+    texts = {}
+    for document_id, rows in groupby(result.all(), key=lambda row: row.document_id):
+        texts[document_id] = "".join(await decode_pages(document_id, list(rows)))
+
+    legacy_ids = [document_id for document_id in set(document_ids) if document_id not in texts]
+    if legacy_ids:
+        result = await db.execute(
+            select(Document.id, Document.content).where(Document.id.in_(legacy_ids))
+        )
+        texts.update({row.id: row.content for row in result})
+    return texts
+
+
+async def load_content(db: AsyncSession, document_id: int) -> Optional[str]:
+    """load_contents for a single document."""
+    return (await load_contents(db, [document_id])).get(document_id)
+
+
+async def link_page_file(source_id: int, target_id: int) -> None:
+    """Give target_id its own name for source_id's page file, if there is one (no-op otherwise)."""
+    source_path = content_file_path(source_id)
+    if os.path.exists(source_path):
+        await asyncio.to_thread(_link_or_copy, source_path, content_file_path(target_id))
+
+
+def page_file_paths(document_id: int) -> list[str]:
+    """The document's page file, if it has one."""
+    path = content_file_path(document_id)
+    return [path] if os.path.exists(path) else []
+
+
+async def update_search_vectors(db: AsyncSession, texts: dict[int, Optional[str]]) -> None:
+    """
+    Compute documents' search vectors from their filename and text.
+
+    Every new document goes through here, including ones without text yet
+    (queued or linked duplicates, passed as None). The vector weighs the
+    filename (A) above the first SEARCH_MAX_INDEXED_CHARS characters of
+    text (B), so search matches documents without reading their pages.
+
+    Args:
+        db: Database session (not committed)
+        texts: Text (or None) by document id; only its first SEARCH_MAX_INDEXED_CHARS are used
+    """
+    if not texts:
+        return
+    documents = Document.__table__
+    await db.execute(
+        update(documents)
+        .where(documents.c.id == bindparam("p_document_id"))
+        .values(
+            search_vector=func.setweight(
+                func.to_tsvector(SEARCH_CONFIG, func.coalesce(documents.c.filename, "")), literal_column("'A'")
+            ).op("||")(
+                func.setweight(func.to_tsvector(SEARCH_CONFIG, bindparam("p_search_text")), literal_column("'B'"))
+            ),
+        ),
+        [
+            {"p_document_id": document_id, "p_search_text": (text or "")[:SEARCH_MAX_INDEXED_CHARS]}
+            for document_id, text in sorted(texts.items())
+        ],
+    )
@@ -0,0 +1,105 @@
+import json
+import logging
+import time
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CountStrategy(str, Enum):
+    """How list endpoints compute PaginatedResponse.total."""
+
+    exact = "exact"
+    estimated = "estimated"
+    none = "none"
+
+
+# (table, *filters) -> (expires_at, count). Per process; the short TTL bounds
+# staleness caused by writes handled by other workers.
+_count_cache: dict[tuple, tuple[float, int]] = {}
+
+
+def invalidate_counts(table: str) -> None:
+    """Drop cached exact counts for a table after rows were inserted or deleted."""
+    for key in [key for key in _count_cache if key[0] == table]:
+        del _count_cache[key]
+
+
+async def _exact_count(db: AsyncSession, rows: Select, cache_key: tuple) -> int:
+    cached = _count_cache.get(cache_key)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    result = await db.execute(select(func.count()).select_from(rows.subquery()))
+    total = result.scalar_one()
+
+    if settings.COUNT_CACHE_TTL > 0:
+        _count_cache[cache_key] = (time.monotonic() + settings.COUNT_CACHE_TTL, total)
+    return total
+
+
+async def _planner_estimate(db: AsyncSession, rows: Select) -> int:
+    """Row estimate for an arbitrary select, taken from the planner via EXPLAIN."""
+    conn = await db.connection()
+    # Expanding IN lists (tag filters) only get their placeholders at execution time
+    compiled = rows.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    if compiled.positiontup:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def _table_estimate(db: AsyncSession, table: str) -> Optional[int]:
+    """Row estimate for a whole table from pg_class statistics (None if never analyzed)."""
+    result = await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+        {"table": table},
+    )
+    estimate = result.scalar_one_or_none()
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+async def count_rows(
+    db: AsyncSession,
+    rows: Select,
+    strategy: CountStrategy,
+    cache_key: tuple,
+) -> tuple[Optional[int], bool]:
+    """
+    Count the rows matched by a list query according to the requested strategy.
+
+    Args:
+        db: Database session
+        rows: Select returning one row per matched item (filters applied, no paging)
+        strategy: exact (TTL-cached), estimated (planner statistics) or none
+        cache_key: Table name followed by the filter values, e.g. ("documents", tag);
+            filter values are None when unfiltered, which allows the pg_class estimate
+
+    Returns:
+        Tuple of (total or None, whether the total is an estimate)
+    """
+    if strategy == CountStrategy.none:
+        return None, False
+
+    if strategy == CountStrategy.estimated:
+        filtered = any(value is not None for value in cache_key[1:])
+        estimate = None if filtered else await _table_estimate(db, cache_key[0])
+        if estimate is None:
+            estimate = await _planner_estimate(db, rows)
+        return estimate, True
+
+    return await _exact_count(db, rows, cache_key), False
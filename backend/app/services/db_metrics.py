@@ -0,0 +1,150 @@
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.services.metrics import (
+    Histogram,
+    DB_QUERY_DURATION,
+    format_sample,
+    register_collector,
+    request_db_stats,
+)
+from app.services.profiling import record_statement
+
+# Engines reported by /metrics and /health/db-pool, by name ("primary", "replica")
+_engines: dict[str, AsyncEngine] = {}
+
+_QUERY_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """The default async queue pool, timing every checkout."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Time spent getting a connection, including opening a new one while
+        # below pool_size + max_overflow and waiting for a free one above it
+        self.checkout_wait = Histogram()
+        self.checkout_timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - start)
+
+
+def pool_status(pool) -> dict:
+    """
+    Current pool occupancy and checkout wait statistics.
+
+    checked_out near pool_size + max_overflow, a growing timeouts count, or
+    wait buckets above a few milliseconds mean requests are queuing for
+    connections.
+    """
+    status = {}
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update(
+            checkout_wait_seconds=pool.checkout_wait.snapshot(),
+            timeouts=pool.checkout_timeouts,
+        )
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            pool_size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            # Connections open beyond pool_size (negative while the pool is still filling)
+            overflow=pool.overflow(),
+            timeout=pool.timeout(),
+        )
+    return status
+
+
+def _statement_operation(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    operation = words[0].upper() if words else ""
+    return operation if operation in _QUERY_OPERATIONS else "OTHER"
+
+
+def register_engine(name: str, engine: AsyncEngine) -> None:
+    """
+    Report an engine's pool in /metrics and time every statement it runs.
+
+    Statement timings feed docproc_db_query_duration_seconds and, inside a
+    request, that request's query count and database time, plus its
+    statement log when the request is being profiled.
+    """
+    _engines[name] = engine
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_times"].pop()
+        DB_QUERY_DURATION.observe(elapsed, engine=name, operation=_statement_operation(statement))
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+        record_statement(statement, elapsed)
+
+    def handle_error(context):
+        start_times = context.connection.info.get("query_start_times") if context.connection else None
+        if start_times:
+            start_times.pop()
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", handle_error)
+
+
+def engine_pool_status() -> dict:
+    """pool_status() for every registered engine, by name."""
+    return {name: pool_status(engine.pool) for name, engine in _engines.items()}
+
+
+def _pool_metric_lines() -> list[str]:
+    gauges = {
+        "checked_out": "Connections currently checked out of the pool",
+        "idle": "Open connections waiting in the pool",
+        "overflow": "Connections open beyond pool_size",
+    }
+    statuses = engine_pool_status()
+
+    lines = []
+    for key, description in gauges.items():
+        name = f"docproc_db_pool_{key}"
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} gauge"]
+        for engine_name, status in statuses.items():
+            if key in status:
+                lines.append(format_sample(name, {"engine": engine_name}, status[key]))
+
+    name = "docproc_db_pool_timeouts_total"
+    lines += [f"# HELP {name} Checkouts that gave up after pool_timeout", f"# TYPE {name} counter"]
+    for engine_name, status in statuses.items():
+        if "timeouts" in status:
+            lines.append(format_sample(name, {"engine": engine_name}, status["timeouts"]))
+
+    name = "docproc_db_pool_checkout_wait_seconds"
+    lines += [f"# HELP {name} Time to get a connection from the pool", f"# TYPE {name} histogram"]
+    for engine_name, status in statuses.items():
+        snapshot = status.get("checkout_wait_seconds")
+        if snapshot is None:
+            continue
+        labels = {"engine": engine_name}
+        for bound, count in snapshot["buckets"].items():
+            lines.append(format_sample(f"{name}_bucket", {**labels, "le": bound}, count))
+        lines.append(format_sample(f"{name}_sum", labels, snapshot["sum"]))
+        lines.append(format_sample(f"{name}_count", labels, snapshot["count"]))
+
+    return lines
+
+
+register_collector(_pool_metric_lines)
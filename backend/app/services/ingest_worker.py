@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, or_
+
+from app.config import settings
+from app.database import async_session
+from app.models import Document, ProcessingStatus
+from app.services.content_store import update_search_vectors
+from app.services.page_store import extract_and_store_pages
+from app.services.pdf_processor import ExtractionLimitError
+
+logger = logging.getLogger(__name__)
+
+_worker_tasks: list[asyncio.Task] = []
+_wakeup = asyncio.Event()
+
+
+def notify_ingest_workers() -> None:
+    """Wake idle workers in this process after a new job has been queued."""
+    _wakeup.set()
+
+
+async def claim_next_job() -> Optional[tuple[int, int, str, int]]:
+    """
+    Claim the oldest runnable job from processing_statuses.
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED so concurrent workers (in this or
+    other processes) never claim the same row. Jobs left in "processing" by a
+    crashed worker become claimable again once their lease expires.
+
+    Returns:
+        Tuple of (job_id, document_id, file_path, attempts), or None if the queue is empty
+    """
+    now = datetime.utcnow()
+    async with async_session() as db:
+        result = await db.execute(
+            select(ProcessingStatus)
+            .where(
+                ProcessingStatus.status.in_(["queued", "processing"]),
+                or_(
+                    ProcessingStatus.next_attempt_at.is_(None),
+                    ProcessingStatus.next_attempt_at <= now,
+                ),
+            )
+            .order_by(ProcessingStatus.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = result.scalar_one_or_none()
+        if job is None:
+            return None
+
+        job.status = "processing"
+        job.attempts = (job.attempts or 0) + 1
+        job.next_attempt_at = now + timedelta(seconds=settings.INGEST_JOB_LEASE)
+        await db.commit()
+
+        return job.id, job.document_id, job.file_path, job.attempts
+
+
+def _remove_file(file_path: Optional[str]) -> None:
+    if file_path and os.path.exists(file_path):
+        os.remove(file_path)
+
+
+async def _record_failure(
+    job_id: int, file_path: str, attempts: int, error: str, permanent: bool = False
+) -> None:
+    """
+    Requeue the job with exponential backoff, or mark it failed after the last attempt.
+
+    permanent marks it failed straight away, for errors a retry would only repeat.
+    """
+    if permanent:
+        attempts = max(attempts, settings.INGEST_MAX_ATTEMPTS)
+    async with async_session() as db:
+        job = await db.get(ProcessingStatus, job_id)
+        if job is None:
+            _remove_file(file_path)
+            return
+
+        job.error_message = error
+        if attempts < settings.INGEST_MAX_ATTEMPTS:
+            delay = settings.INGEST_RETRY_BACKOFF * (2 ** (attempts - 1))
+            job.status = "queued"
+            job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning(
+                f"Ingest job {job_id} failed (attempt {attempts}/{settings.INGEST_MAX_ATTEMPTS}), "
+                f"retrying in {delay:.0f}s: {error}"
+            )
+        else:
+            job.status = "failed"
+            job.next_attempt_at = None
+            job.processed_at = datetime.utcnow()
+            job.file_path = None
+            logger.error(f"Ingest job {job_id} failed permanently: {error}")
+        await db.commit()
+
+    if attempts >= settings.INGEST_MAX_ATTEMPTS:
+        _remove_file(file_path)
+
+
+async def process_job(job_id: int, document_id: int, file_path: str, attempts: int) -> None:
+    """Extract a claimed job's PDF and store the result on its document."""
+    try:
+        async with async_session() as db:
+            document = await db.get(Document, document_id)
+            job = await db.get(ProcessingStatus, job_id)
+            if document is None or job is None:
+                # Document was deleted while it was queued
+                logger.info(f"Ingest job {job_id} dropped: document {document_id} no longer exists")
+                _remove_file(file_path)
+                return
+
+            # Pages are inserted as they are parsed; a failure rolls all of them back
+            search_text, page_count = await extract_and_store_pages(db, document_id, file_path)
+            await update_search_vectors(db, {document_id: search_text})
+            document.page_count = page_count
+            job.status = "completed"
+            job.error_message = None
+            job.processed_at = datetime.utcnow()
+            job.next_attempt_at = None
+            job.file_path = None
+            await db.commit()
+    except ExtractionLimitError as e:
+        # The same PDF exceeds the same limits on every attempt
+        await _record_failure(job_id, file_path, attempts, str(e), permanent=True)
+        return
+    except Exception as e:
+        await _record_failure(job_id, file_path, attempts, str(e))
+        return
+
+    _remove_file(file_path)
+    logger.info(f"Ingest job {job_id} completed: document {document_id} ({page_count} pages)")
+
+
+async def _worker_loop(worker_id: int) -> None:
+    logger.info(f"Ingest worker {worker_id} started")
+    while True:
+        try:
+            job = await claim_next_job()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ingest worker {worker_id} could not claim a job: {str(e)}")
+            job = None
+
+        if job is None:
+            _wakeup.clear()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=settings.INGEST_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        await process_job(*job)
+
+
+def start_ingest_workers() -> None:
+    """Start the background worker pool. Called from the application lifespan."""
+    if settings.INGEST_MODE != "async" or _worker_tasks:
+        return
+    for worker_id in range(settings.INGEST_WORKERS):
+        _worker_tasks.append(asyncio.create_task(_worker_loop(worker_id)))
+
+
+async def stop_ingest_workers() -> None:
+    """Cancel the worker pool. Claimed jobs are picked up again after their lease expires."""
+    for task in _worker_tasks:
+        task.cancel()
+    await asyncio.gather(*_worker_tasks, return_exceptions=True)
+    _worker_tasks.clear()
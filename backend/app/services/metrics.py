@@ -0,0 +1,232 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from fastapi import Request, Response
+
+# Upper bounds in seconds, from sub-millisecond pool checkouts to slow PDF extraction
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Upper bounds for small counts, such as queries per request
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+# [statement_count, seconds] for the request being handled; filled in by the
+# statement hooks in db_metrics, reported by record_request_metrics
+request_db_stats: ContextVar[Optional[list]] = ContextVar("request_db_stats", default=None)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram of durations in seconds, Prometheus style.
+
+    Observations are counted in the first bucket whose upper bound is >= the
+    value; snapshot() returns cumulative counts plus the "+Inf" total.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        # Pool events fire on the event loop thread, extraction timings may not
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict:
+        """Return {"buckets": {upper_bound: cumulative_count}, "count": n, "sum": seconds}."""
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+
+        cumulative = {}
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative[str(bound)] = running
+        running += counts[-1]
+        cumulative["+Inf"] = running
+
+        return {"buckets": cumulative, "count": running, "sum": total_sum}
+
+
+# Everything rendered by /metrics: metric objects plus callables producing
+# extra exposition lines at scrape time (pool gauges)
+_registry: list = []
+_collectors: list[Callable[[], list[str]]] = []
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def format_sample(name: str, labels: dict, value: float) -> str:
+    return f"{name}{_format_labels(labels)} {value}"
+
+
+class HistogramMetric:
+    """A named histogram with one Histogram per label combination."""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._children: dict[tuple, Histogram] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _child(self, labels: dict) -> Histogram:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, Histogram(self.buckets))
+        return child
+
+    def observe(self, value: float, **labels) -> None:
+        self._child(labels).observe(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the with-block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, child in sorted(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            snapshot = child.snapshot()
+            for bound, count in snapshot["buckets"].items():
+                lines.append(format_sample(f"{self.name}_bucket", {**labels, "le": bound}, count))
+            lines.append(format_sample(f"{self.name}_sum", labels, snapshot["sum"]))
+            lines.append(format_sample(f"{self.name}_count", labels, snapshot["count"]))
+        return lines
+
+
+class CounterMetric:
+    """A monotonically increasing total, per label combination."""
+
+    def __init__(self, name: str, description: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(format_sample(self.name, dict(zip(self.labelnames, key)), value))
+        return lines
+
+
+def register_collector(collector: Callable[[], list[str]]) -> None:
+    """Add a callable returning exposition lines, evaluated on every scrape."""
+    _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_DURATION = HistogramMetric(
+    "docproc_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+REQUEST_DB_QUERIES = HistogramMetric(
+    "docproc_http_request_db_queries",
+    "Database statements executed while handling a request",
+    ("route",),
+    COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS = HistogramMetric(
+    "docproc_http_request_db_seconds",
+    "Time spent in database statements while handling a request",
+    ("route",),
+)
+UPLOAD_STAGE_DURATION = HistogramMetric(
+    "docproc_upload_stage_duration_seconds",
+    "Time spent in each stage of a document upload",
+    ("stage",),
+)
+UPLOAD_BYTES = CounterMetric("docproc_upload_bytes_total", "Bytes received in uploaded files")
+UPLOAD_FILES = CounterMetric("docproc_upload_files_total", "Uploaded files by outcome", ("outcome",))
+PDF_EXTRACTION_DURATION = HistogramMetric(
+    "docproc_pdf_extraction_duration_seconds",
+    "Wall-clock time to extract a whole PDF, including pool queueing",
+)
+PDF_PAGE_EXTRACTION_DURATION = HistogramMetric(
+    "docproc_pdf_page_extraction_duration_seconds",
+    "Parser time per PDF page",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+RESPONSE_CACHE_LOOKUPS = CounterMetric(
+    "docproc_response_cache_lookups_total",
+    "Response cache lookups by cached route and outcome (hit, miss)",
+    ("kind", "outcome"),
+)
+DB_QUERY_DURATION = HistogramMetric(
+    "docproc_db_query_duration_seconds",
+    "Database statement execution time by engine and statement type",
+    ("engine", "operation"),
+)
+
+
+async def record_request_metrics(request: Request, call_next) -> Response:
+    """
+    HTTP middleware observing latency, statement count and database time per
+    route template. Streaming responses are timed until their headers are sent.
+    """
+    stats = [0, 0.0]
+    token = request_db_stats.set(stats)
+    status = 500
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        request_db_stats.reset(token)
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        REQUEST_DURATION.observe(elapsed, method=request.method, route=route_path, status=status)
+        REQUEST_DB_QUERIES.observe(stats[0], route=route_path)
+        REQUEST_DB_SECONDS.observe(stats[1], route=route_path)
@@ -0,0 +1,130 @@
+from sqlalchemy import bindparam, delete, func, insert, select, literal, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import DocumentPage, SEARCH_CONFIG, SEARCH_MAX_INDEXED_CHARS
+from app.services.content_store import encode_pages, link_page_file, page_file_paths, reset_page_file
+from app.services.pdf_processor import iter_pages_from_pdf
+
+
+async def store_pages(
+    db: AsyncSession,
+    document_id: int,
+    pages: list[str],
+    first_page_number: int = 1,
+) -> None:
+    """Insert one document_pages row per extracted page (1-based page numbers)."""
+    await store_many_pages(db, {document_id: pages}, first_page_number)
+
+
+async def store_many_pages(
+    db: AsyncSession,
+    pages_by_document: dict[int, list[str]],
+    first_page_number: int = 1,
+) -> None:
+    """
+    Insert the pages of several documents with one statement.
+
+    Pages are the only stored copy of a document's text, written the way
+    CONTENT_STORAGE says (see content_store.encode_pages). Their search
+    vectors are computed from the text on the way in, so search never reads
+    the stored text back.
+    """
+    rows = []
+    for document_id, pages in pages_by_document.items():
+        rows.extend(await encode_pages(document_id, pages, first_page_number))
+    if not rows:
+        return
+    # Parameter names must not collide with the column names in an INSERT
+    await db.execute(
+        insert(DocumentPage.__table__).values(
+            document_id=bindparam("p_document_id"),
+            page_number=bindparam("p_page_number"),
+            text=bindparam("p_text"),
+            data=bindparam("p_data"),
+            data_offset=bindparam("p_data_offset"),
+            data_length=bindparam("p_data_length"),
+            search_vector=func.to_tsvector(SEARCH_CONFIG, bindparam("p_search_text")),
+        ),
+        [{f"p_{key}": value for key, value in row.items()} for row in rows],
+    )
+
+
+async def extract_and_store_pages(db: AsyncSession, document_id: int, file_path: str) -> tuple[str, int]:
+    """
+    Stream a PDF's pages into document_pages as they are parsed.
+
+    Each batch is inserted before the next one is parsed, inside the caller's
+    transaction, so nothing is visible (or left behind) unless the caller
+    commits; a page file written for a PDF that then fails is removed.
+    Only one batch of pages and the indexed prefix of the text are held in
+    memory at a time. The price is a connection held idle in transaction
+    while later batches are parsed, for up to PDF_EXTRACTION_TIMEOUT.
+
+    Returns:
+        Tuple of (first SEARCH_MAX_INDEXED_CHARS characters of the text, page_count),
+        the prefix being what update_search_vectors indexes
+
+    Raises:
+        ExtractionLimitError: If the PDF exceeds a page, character or time limit
+        ValueError: If PDF processing fails
+    """
+    reset_page_file(document_id)
+    search_text = ""
+    page_count = 0
+    next_page_number = 1
+    try:
+        async for pages, page_count in iter_pages_from_pdf(file_path):
+            await store_pages(db, document_id, pages, first_page_number=next_page_number)
+            next_page_number += len(pages)
+            if len(search_text) < SEARCH_MAX_INDEXED_CHARS:
+                search_text = (search_text + "".join(pages))[:SEARCH_MAX_INDEXED_CHARS]
+    except Exception:
+        reset_page_file(document_id)
+        raise
+    return search_text, page_count
+
+
+async def copy_pages(db: AsyncSession, source_id: int, target_id: int) -> None:
+    """Copy another document's page rows inside the database, without loading the text."""
+    await link_page_file(source_id, target_id)
+    await db.execute(
+        insert(DocumentPage).from_select(
+            ["document_id", "page_number", "text", "data", "data_offset", "data_length", "search_vector"],
+            select(
+                literal(target_id),
+                DocumentPage.page_number,
+                DocumentPage.text,
+                DocumentPage.data,
+                DocumentPage.data_offset,
+                DocumentPage.data_length,
+                DocumentPage.search_vector,
+            ).where(DocumentPage.document_id == source_id),
+        )
+    )
+
+
+async def move_pages(db: AsyncSession, source_id: int, target_id: int) -> list[str]:
+    """
+    Hand a document's page rows (and page file) over to another document.
+
+    Returns:
+        Files to remove once the caller has committed
+    """
+    await link_page_file(source_id, target_id)
+    await db.execute(
+        update(DocumentPage)
+        .where(DocumentPage.document_id == source_id)
+        .values(document_id=target_id)
+    )
+    return page_file_paths(source_id)
+
+
+async def delete_pages(db: AsyncSession, document_id: int) -> list[str]:
+    """
+    Delete a document's page rows.
+
+    Returns:
+        Files to remove once the caller has committed
+    """
+    await db.execute(delete(DocumentPage).where(DocumentPage.document_id == document_id))
+    return page_file_paths(document_id)
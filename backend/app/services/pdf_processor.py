@@ -1,20 +1,75 @@
-import fitz
+import asyncio
 import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Iterator, Optional
+
+import fitz
+
+from app.config import settings
+from app.services.metrics import PDF_EXTRACTION_DURATION, PDF_PAGE_EXTRACTION_DURATION
 
 logger = logging.getLogger(__name__)
 
+_executor: Optional[ProcessPoolExecutor] = None
 
-async def extract_text_from_pdf(file_path: str) -> tuple[str, int]:
+
+class ExtractionLimitError(ValueError):
+    """Raised when a PDF exceeds PDF_MAX_PAGES, PDF_MAX_CHARS or the extraction time budget."""
+
+
+def iter_page_text(
+    doc: fitz.Document,
+    start: int = 0,
+    stop: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> Iterator[tuple[str, float]]:
     """
-    Extract text and page count from a PDF file.
+    Yield (text, parse_seconds) for pages start..stop-1 of an open document, one at a time.
 
-    Args:
-        file_path: Path to the PDF file
+    A page whose text cannot be extracted yields an empty string so page
+    numbers stay aligned with the PDF.
 
-    Returns:
-        Tuple of (text_content, page_count)
+    Raises:
+        ExtractionLimitError: If time.time() passes deadline (checked between pages)
+    """
+    for page_num in range(start, len(doc) if stop is None else min(stop, len(doc))):
+        if deadline is not None and time.time() > deadline:
+            raise ExtractionLimitError(
+                f"PDF extraction timed out after {settings.PDF_EXTRACTION_TIMEOUT:.0f}s"
+            )
+        page_start = time.perf_counter()
+        try:
+            text = doc[page_num].get_text()
+        except Exception as e:
+            logger.warning(f"Failed to extract text from page {page_num + 1}: {str(e)}")
+            # Continue processing other pages
+            text = ""
+        yield text, time.perf_counter() - page_start
+
+
+def _extract_pages_sync(
+    file_path: str,
+    start: int = 0,
+    count: Optional[int] = None,
+    deadline: Optional[float] = None,
+    max_chars: int = 0,
+) -> tuple[list[str], int, list[float]]:
+    """
+    Blocking PyMuPDF extraction. Runs inside a pool worker, never on the event loop.
+
+    Extracts count pages from start (all remaining pages when count is None),
+    stopping early at deadline or once the pages would add more than
+    max_chars characters (0 = no limit). Documents over PDF_MAX_PAGES are
+    rejected on open, before any page is parsed.
+
+    Returns one string per page, the document's page count and the parse
+    time of each page, since metrics recorded inside a worker process would
+    never reach /metrics.
 
     Raises:
+        ExtractionLimitError: If a page, character or time limit is exceeded
         ValueError: If PDF processing fails
     """
     doc = None
@@ -23,25 +78,187 @@ async def extract_text_from_pdf(file_path: str) -> tuple[str, int]:
         if doc.is_encrypted:
             raise ValueError("PDF is encrypted and cannot be processed")
 
-        text = ""
-        for page_num, page in enumerate(doc):
-            try:
-                page_text = page.get_text()
-                text += page_text
-            except Exception as e:
-                logger.warning(f"Failed to extract text from page {page_num + 1}: {str(e)}")
-                # Continue processing other pages
-
         page_count = len(doc)
+        if settings.PDF_MAX_PAGES and page_count > settings.PDF_MAX_PAGES:
+            raise ExtractionLimitError(
+                f"PDF has {page_count} pages; the limit is {settings.PDF_MAX_PAGES}"
+            )
 
-        if not text.strip():
-            logger.warning(f"PDF {file_path} contains no extractable text")
+        pages = []
+        page_seconds = []
+        chars = 0
+        stop = None if count is None else start + count
+        for text, seconds in iter_page_text(doc, start, stop, deadline):
+            chars += len(text)
+            if max_chars and chars > max_chars:
+                raise ExtractionLimitError(
+                    f"PDF text exceeds the limit of {settings.PDF_MAX_CHARS} characters"
+                )
+            pages.append(text)
+            page_seconds.append(seconds)
 
-        return text, page_count
+        return pages, page_count, page_seconds
     except fitz.FileDataError as e:
         raise ValueError(f"Invalid or corrupted PDF file: {str(e)}")
+    except ValueError:
+        raise
     except Exception as e:
         raise ValueError(f"Failed to process PDF: {str(e)}")
     finally:
         if doc is not None:
             doc.close()
+
+
+def get_extraction_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the shared extraction pool, creating it on first use.
+
+    Returns None when PDF_EXTRACTION_WORKERS is 0, in which case extraction
+    runs in the default thread executor instead.
+    """
+    global _executor
+    if settings.PDF_EXTRACTION_WORKERS <= 0:
+        return None
+    if _executor is None:
+        max_tasks = settings.PDF_MAX_TASKS_PER_CHILD or None
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.PDF_EXTRACTION_WORKERS,
+            max_tasks_per_child=max_tasks,
+        )
+        logger.info(
+            f"Started PDF extraction pool: workers={settings.PDF_EXTRACTION_WORKERS}, "
+            f"max_tasks_per_child={max_tasks}"
+        )
+    return _executor
+
+
+def shutdown_extraction_pool() -> None:
+    """Stop the extraction pool. Called from the application lifespan."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def iter_pages_from_pdf(file_path: str) -> AsyncIterator[tuple[list[str], int]]:
+    """
+    Yield a PDF's page texts in order, PDF_EXTRACTION_BATCH_PAGES at a time, as they are parsed.
+
+    Each batch is parsed by one call into the extraction process pool, so a
+    caller can store the first pages while later ones are still unparsed and
+    only one batch is held at a time. Every call opens the PDF again, which
+    is why batches are large; a call is also one task towards
+    PDF_MAX_TASKS_PER_CHILD, so a worker can be recycled between batches.
+
+    Limits stop a pathological PDF early:
+    PDF_MAX_PAGES is checked before any page is parsed, PDF_MAX_CHARS as the
+    text accumulates, and PDF_EXTRACTION_TIMEOUT bounds the wall-clock time
+    for the whole document, including inside the worker between pages.
+
+    Args:
+        file_path: Path to the PDF file
+
+    Yields:
+        Tuple of (page_texts, page_count) for each batch
+
+    Raises:
+        ExtractionLimitError: If a page, character or time limit is exceeded
+        ValueError: If PDF processing fails
+    """
+    global _executor
+    loop = asyncio.get_running_loop()
+    # Wall clock rather than perf_counter: the deadline is checked in another process
+    deadline = time.time() + settings.PDF_EXTRACTION_TIMEOUT
+    batch_pages = max(settings.PDF_EXTRACTION_BATCH_PAGES, 1)
+    next_page = 0
+    page_count = None
+    chars = 0
+    has_text = False
+    extraction_seconds = 0.0
+
+    while page_count is None or next_page < page_count:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise ExtractionLimitError(
+                f"PDF extraction timed out after {settings.PDF_EXTRACTION_TIMEOUT:.0f}s"
+            )
+        max_chars = settings.PDF_MAX_CHARS - chars if settings.PDF_MAX_CHARS else 0
+        future = loop.run_in_executor(
+            get_extraction_pool(),
+            _extract_pages_sync,
+            file_path,
+            next_page,
+            batch_pages,
+            deadline,
+            max_chars,
+        )
+
+        batch_start = time.perf_counter()
+        try:
+            pages, page_count, page_seconds = await asyncio.wait_for(future, timeout=remaining)
+        except asyncio.TimeoutError:
+            # The worker stops at its next page boundary; the caller stops waiting now.
+            raise ExtractionLimitError(
+                f"PDF extraction timed out after {settings.PDF_EXTRACTION_TIMEOUT:.0f}s"
+            )
+        except BrokenProcessPool as e:
+            # A worker died (e.g. segfault in the parser); drop the pool so the next call rebuilds it
+            logger.error(f"PDF extraction pool is broken, recreating: {str(e)}")
+            _executor = None
+            raise ValueError("Failed to process PDF: extraction worker crashed")
+        extraction_seconds += time.perf_counter() - batch_start
+
+        for seconds in page_seconds:
+            PDF_PAGE_EXTRACTION_DURATION.observe(seconds)
+        chars += sum(len(page_text) for page_text in pages)
+        has_text = has_text or any(page_text.strip() for page_text in pages)
+        next_page += len(pages)
+
+        yield pages, page_count
+        if not pages:
+            break
+
+    PDF_EXTRACTION_DURATION.observe(extraction_seconds)
+    if not has_text:
+        logger.warning(f"PDF {file_path} contains no extractable text")
+
+
+async def extract_pages_from_pdf(file_path: str) -> tuple[list[str], int]:
+    """
+    Extract the text of each page and the page count from a PDF file.
+
+    The parsing itself runs in the extraction process pool so a large PDF
+    does not block the event loop for other requests. Prefer
+    iter_pages_from_pdf when the pages can be consumed as they arrive.
+
+    Args:
+        file_path: Path to the PDF file
+
+    Returns:
+        Tuple of (page_texts, page_count)
+
+    Raises:
+        ExtractionLimitError: If a page, character or time limit is exceeded
+        ValueError: If PDF processing fails
+    """
+    pages = []
+    page_count = 0
+    async for batch, page_count in iter_pages_from_pdf(file_path):
+        pages.extend(batch)
+    return pages, page_count
+
+
+async def extract_text_from_pdf(file_path: str) -> tuple[str, int]:
+    """
+    Extract text and page count from a PDF file.
+
+    Args:
+        file_path: Path to the PDF file
+
+    Returns:
+        Tuple of (text_content, page_count)
+
+    Raises:
+        ValueError: If PDF processing fails
+    """
+    pages, page_count = await extract_pages_from_pdf(file_path)
+    return "".join(pages), page_count
@@ -0,0 +1,157 @@
+import cProfile
+import io
+import logging
+import pstats
+import random
+import secrets
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Requests carrying this header with PROFILE_TOKEN as its value are always profiled and stored
+PROFILE_HEADER = "X-Profile"
+# Set on responses whose profile was stored, with the id to fetch it by
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Functions kept from each profile, by cumulative time
+PROFILE_TOP_FUNCTIONS = 60
+# Statement text is truncated to this many characters in stored profiles
+MAX_STATEMENT_LENGTH = 2000
+
+# Statements run by the profiled request, as [statement, seconds]; filled in by
+# the statement hooks in db_metrics
+request_statement_log: ContextVar[Optional[list]] = ContextVar("request_statement_log", default=None)
+
+# Most recent stored profiles, oldest first
+_profiles: deque[dict] = deque(maxlen=max(settings.PROFILE_MAX_STORED, 1))
+
+# cProfile can only trace one request at a time per process; others go unprofiled
+_profiler_lock = threading.Lock()
+
+
+def record_statement(statement: str, seconds: float) -> None:
+    """Append a statement to the profiled request's log, if one is being profiled."""
+    log = request_statement_log.get()
+    if log is not None:
+        log.append([statement[:MAX_STATEMENT_LENGTH], seconds])
+
+
+def token_matches(value: Optional[str]) -> bool:
+    """True if PROFILE_TOKEN is configured and value equals it."""
+    if not settings.PROFILE_TOKEN or not value:
+        return False
+    return secrets.compare_digest(value, settings.PROFILE_TOKEN)
+
+
+def _profile_reason(request: Request) -> Optional[str]:
+    if not settings.PROFILE_TOKEN:
+        return None
+    if token_matches(request.headers.get(PROFILE_HEADER)):
+        return "header"
+    if settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+def _format_stats(profiler: cProfile.Profile) -> str:
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_FUNCTIONS)
+    return output.getvalue()
+
+
+async def profile_requests(request: Request, call_next) -> Response:
+    """
+    HTTP middleware profiling opted-in requests with cProfile and logging their SQL.
+
+    A request is profiled when it carries X-Profile: <PROFILE_TOKEN>, or at
+    random with probability PROFILE_SAMPLE_RATE. Sampled profiles are kept
+    only when the request took at least PROFILE_SLOW_THRESHOLD seconds;
+    header-requested ones are always kept. Nothing runs unless PROFILE_TOKEN
+    is set.
+
+    The profiler traces the whole event loop thread, so work of concurrent
+    requests can show up in a profile; PDF parsing in the extraction pool
+    does not. Streaming responses are profiled until their headers are sent.
+    """
+    reason = _profile_reason(request)
+    if reason is None or not _profiler_lock.acquire(blocking=False):
+        return await call_next(request)
+
+    statements = []
+    token = request_statement_log.set(statements)
+    profiler = cProfile.Profile()
+    started_at = datetime.utcnow()
+    status = 500
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.disable()
+        status = response.status_code
+    finally:
+        duration = time.perf_counter() - start
+        request_statement_log.reset(token)
+        _profiler_lock.release()
+
+        if reason == "header" or duration >= settings.PROFILE_SLOW_THRESHOLD:
+            route = request.scope.get("route")
+            profile_id = uuid.uuid4().hex[:16]
+            _profiles.append({
+                "id": profile_id,
+                "method": request.method,
+                "path": request.url.path,
+                "query": request.url.query,
+                "route": getattr(route, "path", None),
+                "status_code": status,
+                "reason": reason,
+                "started_at": started_at,
+                "duration": duration,
+                "sql_count": len(statements),
+                "sql_seconds": sum(seconds for _, seconds in statements),
+                "statements": [
+                    {"statement": statement, "seconds": seconds} for statement, seconds in statements
+                ],
+                "stats": _format_stats(profiler),
+            })
+            logger.info(
+                f"Stored profile {profile_id} for {request.method} {request.url.path}: "
+                f"{duration:.3f}s, {len(statements)} statements"
+            )
+        else:
+            profile_id = None
+
+    if profile_id is not None:
+        response.headers[PROFILE_ID_HEADER] = profile_id
+    return response
+
+
+def list_profiles() -> list[dict]:
+    """Stored profiles, newest first."""
+    return list(reversed(_profiles))
+
+
+def get_profile(profile_id: str) -> Optional[dict]:
+    for profile in _profiles:
+        if profile["id"] == profile_id:
+            return profile
+    return None
+
+
+def clear_profiles() -> int:
+    """Drop all stored profiles and return how many there were."""
+    count = len(_profiles)
+    _profiles.clear()
+    return count
@@ -0,0 +1,43 @@
+import time
+
+from fastapi import Request, Response
+
+from app.config import settings
+
+# Set on responses to successful writes; reads carrying a fresh one go to the primary
+LAST_WRITE_COOKIE = "docproc_last_write"
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def wrote_recently(request: Request) -> bool:
+    """True if this client made a write within READ_AFTER_WRITE_WINDOW seconds."""
+    value = request.cookies.get(LAST_WRITE_COOKIE)
+    if not value:
+        return False
+    try:
+        written_at = float(value)
+    except ValueError:
+        return False
+    return time.time() - written_at < settings.READ_AFTER_WRITE_WINDOW
+
+
+async def mark_writes(request: Request, call_next) -> Response:
+    """
+    HTTP middleware stamping successful writes with LAST_WRITE_COOKIE, so the
+    same client reads its own changes from the primary while replicas catch up.
+    """
+    response = await call_next(request)
+    if (
+        settings.DATABASE_READ_URL
+        and request.method in WRITE_METHODS
+        and response.status_code < 400
+    ):
+        response.set_cookie(
+            LAST_WRITE_COOKIE,
+            f"{time.time():.3f}",
+            max_age=max(int(settings.READ_AFTER_WRITE_WINDOW) + 1, 1),
+            httponly=True,
+            samesite="lax",
+        )
+    return response
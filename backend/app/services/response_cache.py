@@ -0,0 +1,288 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+
+from app.config import settings
+from app.services.metrics import RESPONSE_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Conditional GETs revalidate every time instead of trusting a heuristic freshness
+CACHE_CONTROL = "private, no-cache"
+
+REDIS_KEY_PREFIX = "docproc:response:"
+# Keys per DEL command when invalidating many documents at once
+REDIS_DELETE_CHUNK = 1000
+
+
+@dataclass
+class CachedResponse:
+    """
+    A serialized JSON body with the validators sent alongside it.
+
+    last_modified is the time the entry was cached, which only says when the
+    answer last changed while the entry is kept (any change invalidates it).
+    Answers that are not stored have no Last-Modified and rely on the ETag.
+    """
+
+    body: bytes
+    etag: str
+    last_modified: Optional[int] = None
+
+    @classmethod
+    def build(cls, body: bytes) -> "CachedResponse":
+        return cls(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+    def _is_fresh_for(self, request: Request) -> bool:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or self.etag in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is None or self.last_modified is None:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return self.last_modified <= since
+
+    def to_response(self, request: Request) -> Response:
+        """The full body, or 304 Not Modified when the client's copy is current."""
+        headers = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = formatdate(self.last_modified, usegmt=True)
+        if self._is_fresh_for(request):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+    def encode(self) -> bytes:
+        return f"{self.etag}\n{self.last_modified}\n".encode() + self.body
+
+    @classmethod
+    def decode(cls, value: bytes) -> "CachedResponse":
+        etag, last_modified, body = value.split(b"\n", 2)
+        return cls(body=body, etag=etag.decode(), last_modified=int(last_modified))
+
+
+def document_cache_key(document_id: int, include_content: bool) -> str:
+    return f"document:{document_id}:{'content' if include_content else 'meta'}"
+
+
+def document_tags_cache_key(document_id: int) -> str:
+    return f"document_tags:{document_id}"
+
+
+def _document_keys(document_id: int) -> list[str]:
+    return [
+        document_cache_key(document_id, True),
+        document_cache_key(document_id, False),
+        document_tags_cache_key(document_id),
+    ]
+
+
+def _tombstone_seconds() -> float:
+    """
+    How long an invalidated key refuses new entries.
+
+    With a read replica, a read right after a write can still see the old
+    rows; caching that answer would outlive the replica lag by the full TTL.
+    """
+    return settings.READ_AFTER_WRITE_WINDOW if settings.DATABASE_READ_URL else 0
+
+
+def _enabled() -> bool:
+    return settings.RESPONSE_CACHE_TTL > 0 and (
+        settings.RESPONSE_CACHE_MAX_BYTES > 0 or bool(settings.RESPONSE_CACHE_REDIS_URL)
+    )
+
+
+# ---------------------------------------------------------------------------
+# In-process store: key -> (expires_at, entry or None for a tombstone), least
+# recently used first, bounded by RESPONSE_CACHE_MAX_BYTES of bodies
+# ---------------------------------------------------------------------------
+
+_local_cache: OrderedDict[str, tuple[float, Optional[CachedResponse]]] = OrderedDict()
+_local_bytes = 0
+
+
+def _local_pop(key: str) -> None:
+    global _local_bytes
+    removed = _local_cache.pop(key, None)
+    if removed is not None and removed[1] is not None:
+        _local_bytes -= len(removed[1].body)
+
+
+def _local_get(key: str) -> Optional[CachedResponse]:
+    cached = _local_cache.get(key)
+    if cached is None:
+        return None
+    if cached[0] <= time.monotonic():
+        _local_pop(key)
+        return None
+    _local_cache.move_to_end(key)
+    return cached[1]
+
+
+def _local_set(key: str, entry: Optional[CachedResponse], ttl: float) -> None:
+    global _local_bytes
+    _local_pop(key)
+    _local_cache[key] = (time.monotonic() + ttl, entry)
+    if entry is not None:
+        _local_bytes += len(entry.body)
+    while _local_cache and (
+        _local_bytes > settings.RESPONSE_CACHE_MAX_BYTES
+        or len(_local_cache) > settings.RESPONSE_CACHE_MAX_ENTRIES
+    ):
+        _local_pop(next(iter(_local_cache)))
+
+
+def _local_add(key: str, entry: CachedResponse) -> bool:
+    """Store unless a live tombstone (or another request's entry) holds the key."""
+    if key in _local_cache and _local_cache[key][0] > time.monotonic():
+        return False
+    _local_set(key, entry, settings.RESPONSE_CACHE_TTL)
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Redis store, shared by every API process
+# ---------------------------------------------------------------------------
+
+_redis = None
+
+
+def _redis_client():
+    global _redis
+    if _redis is None:
+        # Only needed when RESPONSE_CACHE_REDIS_URL is set
+        import redis.asyncio
+
+        _redis = redis.asyncio.from_url(settings.RESPONSE_CACHE_REDIS_URL)
+    return _redis
+
+
+async def close_response_cache() -> None:
+    """Close the Redis connection pool, if one was opened."""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+async def _redis_get(key: str) -> Optional[CachedResponse]:
+    try:
+        value = await _redis_client().get(REDIS_KEY_PREFIX + key)
+    except Exception as e:
+        logger.warning(f"Response cache read failed for {key}: {str(e)}")
+        return None
+    # An empty value is a tombstone
+    return CachedResponse.decode(value) if value else None
+
+
+async def _redis_add(key: str, entry: CachedResponse) -> bool:
+    try:
+        # NX: a tombstone left by a recent invalidation wins over this answer
+        return bool(await _redis_client().set(
+            REDIS_KEY_PREFIX + key, entry.encode(), px=int(settings.RESPONSE_CACHE_TTL * 1000), nx=True
+        ))
+    except Exception as e:
+        logger.warning(f"Response cache write failed for {key}: {str(e)}")
+        return False
+
+
+async def _redis_invalidate(keys: list[str]) -> None:
+    tombstone_ms = int(_tombstone_seconds() * 1000)
+    try:
+        client = _redis_client()
+        for start in range(0, len(keys), REDIS_DELETE_CHUNK):
+            chunk = [REDIS_KEY_PREFIX + key for key in keys[start:start + REDIS_DELETE_CHUNK]]
+            if tombstone_ms > 0:
+                async with client.pipeline(transaction=False) as pipe:
+                    for key in chunk:
+                        pipe.set(key, b"", px=tombstone_ms)
+                    await pipe.execute()
+            else:
+                await client.delete(*chunk)
+    except Exception as e:
+        # Entries then expire after RESPONSE_CACHE_TTL
+        logger.error(f"Response cache invalidation failed for {len(keys)} key(s): {str(e)}")
+
+
+# ---------------------------------------------------------------------------
+# Public interface
+# ---------------------------------------------------------------------------
+
+
+async def get_cached_response(key: str) -> Optional[CachedResponse]:
+    """
+    Return the cached response for key, if any.
+
+    Entries live in this process (an LRU of RESPONSE_CACHE_MAX_BYTES) or,
+    with RESPONSE_CACHE_REDIS_URL set, in Redis so that invalidations reach
+    every API process. Either way they expire after RESPONSE_CACHE_TTL.
+    """
+    if not _enabled():
+        return None
+    kind = key.split(":", 1)[0]
+    if settings.RESPONSE_CACHE_REDIS_URL:
+        entry = await _redis_get(key)
+    else:
+        entry = _local_get(key)
+    RESPONSE_CACHE_LOOKUPS.inc(kind=kind, outcome="miss" if entry is None else "hit")
+    return entry
+
+
+async def cache_response(key: str, body: bytes, store: bool = True) -> CachedResponse:
+    """
+    Wrap a serialized JSON body with an ETag and cache it.
+
+    Bodies above RESPONSE_CACHE_MAX_ENTRY_BYTES are not stored but still get
+    an ETag, so a repeat request is answered with 304 and no body. Only an
+    entry that was stored gets a Last-Modified, since nothing would tell a
+    later request that an unstored answer has changed since.
+
+    Args:
+        key: Cache key (see document_cache_key)
+        body: Serialized JSON response
+        store: False to only compute validators, for answers that may still change
+
+    Returns:
+        The entry, to turn into a response with to_response
+    """
+    entry = CachedResponse.build(body)
+    if store and _enabled() and len(body) <= settings.RESPONSE_CACHE_MAX_ENTRY_BYTES:
+        entry.last_modified = int(time.time())
+        if settings.RESPONSE_CACHE_REDIS_URL:
+            stored = await _redis_add(key, entry)
+        else:
+            stored = _local_add(key, entry)
+        if not stored:
+            entry.last_modified = None
+    return entry
+
+
+async def invalidate_documents(document_ids: Iterable[int]) -> None:
+    """Drop cached document and document tag responses after a commit changed them."""
+    if not _enabled():
+        return
+    keys = [key for document_id in document_ids for key in _document_keys(document_id)]
+    if not keys:
+        return
+    if settings.RESPONSE_CACHE_REDIS_URL:
+        await _redis_invalidate(keys)
+        return
+    tombstone_seconds = _tombstone_seconds()
+    for key in keys:
+        if tombstone_seconds > 0:
+            _local_set(key, None, tombstone_seconds)
+        else:
+            _local_pop(key)
@@ -0,0 +1,98 @@
+import logging
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import Tag
+from app.schemas import TagResponse
+
+logger = logging.getLogger(__name__)
+
+# Shorter terms only match as prefixes: trigram indexes cannot serve them
+MIN_SUBSTRING_LENGTH = 3
+
+# (term, limit) -> (expires_at, suggestions), least recently used first.
+# Per process; the TTL bounds how stale popularity ordering can get.
+_suggestion_cache: OrderedDict[tuple[str, int], tuple[float, list[TagResponse]]] = OrderedDict()
+
+
+def invalidate_tag_suggestions() -> None:
+    """Drop cached suggestions after tags were created or deleted."""
+    _suggestion_cache.clear()
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def _query_suggestions(db: AsyncSession, term: str, limit: int) -> list[TagResponse]:
+    """
+    Prefix matches first, then substring matches, each by popularity.
+
+    Tag names are stored lowercase, so a case-sensitive LIKE is enough: the
+    prefix form uses idx_tag_name_prefix (text_pattern_ops) and the substring
+    form uses idx_tag_name_trgm (pg_trgm) when the extension is available.
+    """
+    escaped = _escape_like(term)
+    is_prefix = Tag.name.like(f"{escaped}%", escape="\\")
+
+    query = select(Tag)
+    if len(term) < MIN_SUBSTRING_LENGTH:
+        query = query.where(is_prefix).order_by(Tag.document_count.desc(), Tag.name)
+    else:
+        query = query.where(Tag.name.like(f"%{escaped}%", escape="\\")).order_by(
+            case((is_prefix, 0), else_=1),
+            Tag.document_count.desc(),
+            Tag.name,
+        )
+
+    result = await db.execute(query.limit(limit))
+    return [
+        TagResponse(
+            id=tag.id,
+            name=tag.name,
+            created_at=tag.created_at,
+            document_count=tag.document_count,
+        )
+        for tag in result.scalars().all()
+    ]
+
+
+async def suggest_tags(db: AsyncSession, term: str, limit: int) -> list[TagResponse]:
+    """
+    Return up to limit tags whose name contains term, best candidates first.
+
+    Results are kept in an LRU cache of TAG_AUTOCOMPLETE_CACHE_SIZE entries
+    for TAG_AUTOCOMPLETE_CACHE_TTL seconds, so repeated keystrokes do not
+    reach the database.
+
+    Args:
+        db: Database session
+        term: Text typed so far (normalized to lowercase)
+        limit: Maximum number of suggestions
+
+    Returns:
+        Matching tags, prefix matches first, then by document_count
+    """
+    term = term.lower().strip()
+    if not term:
+        return []
+
+    key = (term, limit)
+    cached = _suggestion_cache.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        _suggestion_cache.move_to_end(key)
+        return cached[1]
+
+    suggestions = await _query_suggestions(db, term, limit)
+
+    if settings.TAG_AUTOCOMPLETE_CACHE_TTL > 0 and settings.TAG_AUTOCOMPLETE_CACHE_SIZE > 0:
+        _suggestion_cache[key] = (time.monotonic() + settings.TAG_AUTOCOMPLETE_CACHE_TTL, suggestions)
+        _suggestion_cache.move_to_end(key)
+        while len(_suggestion_cache) > settings.TAG_AUTOCOMPLETE_CACHE_SIZE:
+            _suggestion_cache.popitem(last=False)
+
+    return suggestions
@@ -0,0 +1,200 @@
+from collections import Counter
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import select, delete, update, func, exists, false, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models import Document, Tag, document_tags
+
+
+class TagMatch(str, Enum):
+    """How several ?tag= filters combine."""
+
+    all = "all"
+    any = "any"
+
+
+def normalize_tag_names(names: list[str]) -> list[str]:
+    """Lowercase and strip tag names, dropping blanks and repeats. Sorted, so
+    concurrent upserts take row locks in the same order and cannot deadlock."""
+    return sorted({name.lower().strip() for name in names if name and name.strip()})
+
+
+async def ensure_tags(db: AsyncSession, names: list[str]) -> int:
+    """
+    Create a tag for every (normalized) name that does not have one yet.
+
+    Uses INSERT ... ON CONFLICT (name) DO NOTHING, so a concurrent request
+    creating the same tag is not an error.
+
+    Returns:
+        Number of tags created
+    """
+    if not names:
+        return 0
+    result = await db.execute(
+        pg_insert(Tag).on_conflict_do_nothing(index_elements=[Tag.name]).returning(Tag.id),
+        [{"name": name} for name in names],
+    )
+    return len(result.scalars().all())
+
+
+async def get_tags(db: AsyncSession, names: list[str]) -> list[Tag]:
+    """Return the tags with the given names, ordered by name."""
+    if not names:
+        return []
+    result = await db.execute(select(Tag).where(Tag.name.in_(names)).order_by(Tag.name))
+    return list(result.scalars().all())
+
+
+async def find_missing_documents(db: AsyncSession, document_ids: list[int]) -> list[int]:
+    """Return the requested document ids that do not exist."""
+    if not document_ids:
+        return []
+    result = await db.execute(select(Document.id).where(Document.id.in_(document_ids)))
+    existing = set(result.scalars().all())
+    return sorted(set(document_ids) - existing)
+
+
+async def _adjust_document_counts(db: AsyncSession, tag_ids: list[int], sign: int) -> None:
+    """
+    Apply link inserts (sign=1) or deletes (sign=-1) to tags.document_count.
+
+    One UPDATE per distinct tag, sent as a single executemany. Tags are
+    updated in id order so concurrent writers lock them in the same order.
+    """
+    if not tag_ids:
+        return
+    tags = Tag.__table__
+    await db.execute(
+        update(tags)
+        .where(tags.c.id == bindparam("tag_id"))
+        .values(document_count=tags.c.document_count + bindparam("delta")),
+        [
+            {"tag_id": tag_id, "delta": sign * links}
+            for tag_id, links in sorted(Counter(tag_ids).items())
+        ],
+    )
+
+
+async def attach_tags(db: AsyncSession, document_ids: list[int], tag_names: list[str]) -> int:
+    """
+    Link every named tag to every existing document in a single statement.
+
+    INSERT ... SELECT over documents x tags skips ids and names that do not
+    exist, and ON CONFLICT DO NOTHING skips links that are already there.
+    The tags' document_count is raised by the links actually inserted.
+
+    Returns:
+        Number of links inserted
+    """
+    if not document_ids or not tag_names:
+        return 0
+    pairs = (
+        select(Document.id, Tag.id)
+        .join(Tag, Tag.name.in_(tag_names))
+        .where(Document.id.in_(document_ids))
+        .order_by(Document.id, Tag.id)
+    )
+    result = await db.execute(
+        pg_insert(document_tags)
+        .from_select(["document_id", "tag_id"], pairs)
+        .on_conflict_do_nothing()
+        .returning(document_tags.c.tag_id)
+    )
+    tag_ids = result.scalars().all()
+    await _adjust_document_counts(db, tag_ids, 1)
+    return len(tag_ids)
+
+
+async def delete_tag_links(db: AsyncSession, *conditions: ColumnElement) -> int:
+    """
+    Delete the document_tags rows matching conditions and lower the affected
+    tags' document_count accordingly.
+
+    Returns:
+        Number of links deleted
+    """
+    result = await db.execute(
+        delete(document_tags).where(*conditions).returning(document_tags.c.tag_id)
+    )
+    tag_ids = result.scalars().all()
+    await _adjust_document_counts(db, tag_ids, -1)
+    return len(tag_ids)
+
+
+async def detach_tags(db: AsyncSession, document_ids: list[int], tag_names: list[str]) -> int:
+    """
+    Remove the named tags from every listed document in a single statement.
+
+    Returns:
+        Number of links deleted
+    """
+    if not document_ids or not tag_names:
+        return 0
+    return await delete_tag_links(
+        db,
+        document_tags.c.document_id.in_(document_ids),
+        document_tags.c.tag_id.in_(select(Tag.id).where(Tag.name.in_(tag_names))),
+    )
+
+
+async def build_tag_filter(
+    db: AsyncSession,
+    document_id: ColumnElement,
+    tags: list[str],
+    match: TagMatch = TagMatch.all,
+    exclude_tags: Optional[list[str]] = None,
+) -> list[ColumnElement]:
+    """
+    Build WHERE conditions restricting document_id by tag names.
+
+    Names are resolved to ids first, so the conditions only touch
+    document_tags: the (tag_id, document_id) index answers "documents with
+    tag X" and the (document_id, tag_id) primary key answers "does this
+    document have tag X", both without reading tags or documents.
+
+    Args:
+        db: Database session
+        document_id: Document id column the conditions apply to
+        tags: Tag names the document must carry (all of them or any of them)
+        match: all (AND) or any (OR) for tags
+        exclude_tags: Tag names the document must not carry (NOT)
+
+    Returns:
+        Conditions to AND into the query; empty when there is nothing to filter
+    """
+    tag_names = normalize_tag_names(tags)
+    excluded_names = normalize_tag_names(exclude_tags or [])
+    if not tag_names and not excluded_names:
+        return []
+
+    result = await db.execute(
+        select(Tag.name, Tag.id).where(Tag.name.in_(tag_names + excluded_names))
+    )
+    tag_ids = dict(result.all())
+
+    conditions = []
+    if tag_names:
+        wanted = [tag_ids[name] for name in tag_names if name in tag_ids]
+        if not wanted or (match == TagMatch.all and len(wanted) < len(tag_names)):
+            # A required tag does not exist, so nothing can match
+            return [false()]
+        tagged = select(document_tags.c.document_id).where(document_tags.c.tag_id.in_(wanted))
+        if match == TagMatch.all and len(wanted) > 1:
+            tagged = tagged.group_by(document_tags.c.document_id).having(func.count() == len(wanted))
+        conditions.append(document_id.in_(tagged))
+
+    excluded = [tag_ids[name] for name in excluded_names if name in tag_ids]
+    if excluded:
+        conditions.append(
+            ~exists().where(
+                document_tags.c.document_id == document_id,
+                document_tags.c.tag_id.in_(excluded),
+            )
+        )
+
+    return conditions
@@ -0,0 +1,281 @@
+import hashlib
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import aiofiles
+import multipart
+from multipart.multipart import MultipartParseError, parse_options_header
+from starlette.requests import Request
+
+from app.services.metrics import UPLOAD_BYTES, UPLOAD_STAGE_DURATION
+
+logger = logging.getLogger(__name__)
+
+# Allowance per file for the multipart boundary and part headers when the
+# request size is checked against the file size limit
+PART_OVERHEAD_BYTES = 16 * 1024
+
+
+class UploadError(ValueError):
+    """Raised when an upload request or one of its files is rejected (HTTP 400)."""
+
+
+class FileTooLargeError(UploadError):
+    """Raised when an upload exceeds the configured size limit (HTTP 413)."""
+
+
+@dataclass
+class ReceivedFile:
+    """
+    A file part of an upload form, written to disk as its bytes arrived.
+
+    A rejected file has an error and no file_path; nothing of it is kept.
+    """
+
+    filename: str
+    content_type: Optional[str]
+    file_path: Optional[str] = None
+    file_size: int = 0
+    checksum: Optional[str] = None
+    error: Optional[str] = None
+
+
+class _FileWriter:
+    """Writes one file part to disk, hashing it and enforcing max_size on the way."""
+
+    def __init__(self, upload: ReceivedFile, dest_dir: str, max_size: int, chunk_size: int):
+        self.upload = upload
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.path = os.path.join(dest_dir, f"{uuid.uuid4().hex}.upload")
+        self.digest = hashlib.sha256()
+        self.buffer = bytearray()
+        self.out = None
+        self.write_seconds = 0.0
+
+    async def open(self) -> None:
+        self.out = await aiofiles.open(self.path, "wb")
+
+    async def write(self, data: bytes) -> None:
+        self.upload.file_size += len(data)
+        if self.upload.file_size > self.max_size:
+            raise FileTooLargeError(
+                f"File too large. Maximum size is {self.max_size / (1024 * 1024):.1f}MB"
+            )
+        self.digest.update(data)
+        self.buffer += data
+        if len(self.buffer) >= self.chunk_size:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        start = time.perf_counter()
+        await self.out.write(bytes(self.buffer))
+        self.write_seconds += time.perf_counter() - start
+        UPLOAD_BYTES.inc(len(self.buffer))
+        self.buffer.clear()
+
+    async def finish(self) -> None:
+        await self._flush()
+        await self.out.close()
+        self.out = None
+        if self.upload.file_size == 0:
+            await self.discard()
+            raise UploadError("File is empty")
+        self.upload.file_path = self.path
+        self.upload.checksum = self.digest.hexdigest()
+
+    async def discard(self) -> None:
+        if self.out is not None:
+            await self.out.close()
+            self.out = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def receive_files(
+    request: Request,
+    field_name: str,
+    dest_dir: str,
+    max_size: int,
+    max_files: int,
+    chunk_size: int,
+    validate: Callable[[str, Optional[str]], Optional[str]],
+    fail_fast: bool,
+) -> list[ReceivedFile]:
+    """
+    Parse a multipart upload from the request stream, writing each file straight to dest_dir.
+
+    The body is read as it arrives rather than spooled by Starlette first,
+    so each file is written to disk once, the size limit holds as bytes
+    arrive, and a request whose Content-Length already exceeds what
+    max_files files may add up to is refused before its body is read.
+    Files are SHA-256 hashed in the same pass. Time spent waiting for the
+    client and writing to disk is recorded as the "receive" and
+    "disk_write" upload stages.
+
+    Args:
+        request: Incoming multipart/form-data request
+        field_name: Form field holding the files; other fields are skipped
+        dest_dir: Directory the files are written to
+        max_size: Maximum size of one file in bytes
+        max_files: Maximum number of files in the request
+        chunk_size: Bytes buffered before each disk write
+        validate: Called with a file's filename and content type once its
+            headers arrive; returns an error message to reject it unread
+        fail_fast: Raise on the first rejected file (single uploads) instead
+            of recording the error on it and reading on (batches)
+
+    Returns:
+        The received files, in request order
+
+    Raises:
+        FileTooLargeError: If the request or (with fail_fast) a file is too large
+        UploadError: If the request is not an acceptable upload form, or
+            (with fail_fast) a file is rejected
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadError("Expected a multipart/form-data upload")
+
+    max_body = max_files * (max_size + PART_OVERHEAD_BYTES)
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_body:
+        raise FileTooLargeError(
+            f"File too large. Maximum size is {max_size / (1024 * 1024):.1f}MB"
+        )
+
+    files: list[ReceivedFile] = []
+    # Parser callbacks are synchronous; they queue events that are handled
+    # (with awaits) after each chunk is fed to the parser
+    events: list[tuple] = []
+    headers: dict[bytes, bytes] = {}
+    header_name = bytearray()
+    header_value = bytearray()
+
+    def on_part_begin() -> None:
+        headers.clear()
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        header_name.extend(data[start:end])
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        header_value.extend(data[start:end])
+
+    def on_header_end() -> None:
+        headers[bytes(header_name).lower()] = bytes(header_value)
+        header_name.clear()
+        header_value.clear()
+
+    def on_headers_finished() -> None:
+        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+        if options.get(b"name", b"").decode("latin-1") != field_name or b"filename" not in options:
+            events.append(("begin", None))
+            return
+        if len(files) >= max_files:
+            raise UploadError(f"Too many files. Maximum per request is {max_files}")
+        upload = ReceivedFile(
+            filename=options[b"filename"].decode("utf-8", errors="replace"),
+            content_type=headers[b"content-type"].decode("latin-1") if b"content-type" in headers else None,
+        )
+        files.append(upload)
+        events.append(("begin", upload))
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        events.append(("data", data[start:end]))
+
+    def on_part_end() -> None:
+        events.append(("end", None))
+
+    parser = multipart.MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    writer: Optional[_FileWriter] = None
+    write_seconds = 0.0
+    receive_seconds = 0.0
+    received = 0
+
+    async def reject(upload: ReceivedFile, error: UploadError) -> None:
+        nonlocal writer
+        if writer is not None:
+            await writer.discard()
+            writer = None
+        if fail_fast:
+            raise error
+        upload.error = str(error)
+
+    async def handle(event: str, value) -> None:
+        nonlocal writer, write_seconds
+        if event == "begin":
+            if value is None:
+                return
+            error = validate(value.filename, value.content_type)
+            if error is not None:
+                await reject(value, UploadError(error))
+                return
+            writer = _FileWriter(value, dest_dir, max_size, chunk_size)
+            await writer.open()
+        elif writer is None:
+            # Skipped field or rejected file
+            return
+        elif event == "data":
+            try:
+                await writer.write(value)
+            except UploadError as e:
+                await reject(writer.upload, e)
+        else:
+            current, writer = writer, None
+            try:
+                await current.finish()
+            except UploadError as e:
+                await reject(current.upload, e)
+            finally:
+                write_seconds += current.write_seconds
+
+    os.makedirs(dest_dir, exist_ok=True)
+    stream = request.stream().__aiter__()
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = await stream.__anext__()
+            except StopAsyncIteration:
+                break
+            receive_seconds += time.perf_counter() - start
+            received += len(chunk)
+            if received > max_body:
+                raise FileTooLargeError(
+                    f"File too large. Maximum size is {max_size / (1024 * 1024):.1f}MB"
+                )
+            try:
+                parser.write(chunk)
+            except MultipartParseError as e:
+                raise UploadError(f"Malformed multipart upload: {str(e)}")
+            for event, value in events:
+                await handle(event, value)
+            events.clear()
+        parser.finalize()
+        if writer is not None:
+            raise UploadError("Upload ended before the last file was complete")
+    except BaseException:
+        if writer is not None:
+            await writer.discard()
+        for upload in files:
+            if upload.file_path and os.path.exists(upload.file_path):
+                os.remove(upload.file_path)
+        raise
+    finally:
+        UPLOAD_STAGE_DURATION.observe(receive_seconds, stage="receive")
+        UPLOAD_STAGE_DURATION.observe(write_seconds, stage="disk_write")
+
+    return files
@@ -1,5 +1,10 @@
 const API_BASE = import.meta.env.VITE_API_URL || "http://localhost:8000";
 
+// Send cookies so the API can route our reads to the primary right after our writes
+function apiFetch(url, options = {}) {
+  return fetch(url, { credentials: "include", ...options });
+}
+
 async function handleResponse(response) {
   if (!response.ok) {
     let errorMessage = `Request failed: ${response.statusText}`;
@@ -17,7 +22,7 @@ async function handleResponse(response) {
 export async function uploadDocument(file) {
   const formData = new FormData();
   formData.append("file", file);
-  const response = await fetch(`${API_BASE}/documents`, {
+  const response = await apiFetch(`${API_BASE}/documents`, {
     method: "POST",
     body: formData,
   });
@@ -29,31 +34,42 @@ export async function getDocuments(tag = null, skip = 0, limit = 5) {
   if (tag) params.append("tag", tag);
   params.append("skip", skip.toString());
   params.append("limit", limit.toString());
-  const response = await fetch(`${API_BASE}/documents?${params.toString()}`);
+  const response = await apiFetch(`${API_BASE}/documents?${params.toString()}`);
   return handleResponse(response);
 }
 
-export async function getDocument(id) {
-  const response = await fetch(`${API_BASE}/documents/${id}`);
+export async function getDocument(id, includeContent = true) {
+  const query = includeContent ? "" : "?include_content=false";
+  const response = await apiFetch(`${API_BASE}/documents/${id}${query}`);
+  return handleResponse(response);
+}
+
+export async function getDocumentPages(id, start = 1, limit = 10) {
+  const params = new URLSearchParams();
+  params.append("start", start.toString());
+  params.append("limit", limit.toString());
+  const response = await apiFetch(
+    `${API_BASE}/documents/${id}/pages?${params.toString()}`
+  );
   return handleResponse(response);
 }
 
 export async function deleteDocument(id) {
-  const response = await fetch(`${API_BASE}/documents/${id}`, {
+  const response = await apiFetch(`${API_BASE}/documents/${id}`, {
     method: "DELETE",
   });
   return handleResponse(response);
 }
 
 export async function searchDocuments(query) {
-  const response = await fetch(
+  const response = await apiFetch(
     `${API_BASE}/search?q=${encodeURIComponent(query)}`
   );
   return handleResponse(response);
 }
 
 export async function addTagToDocument(documentId, tagName) {
-  const response = await fetch(`${API_BASE}/documents/${documentId}/tags`, {
+  const response = await apiFetch(`${API_BASE}/documents/${documentId}/tags`, {
     method: "POST",
     headers: {
       "Content-Type": "application/json",
@@ -64,7 +80,7 @@ export async function addTagToDocument(documentId, tagName) {
 }
 
 export async function removeTagFromDocument(documentId, tagId) {
-  const response = await fetch(
+  const response = await apiFetch(
     `${API_BASE}/documents/${documentId}/tags/${tagId}`,
     {
       method: "DELETE",
@@ -74,7 +90,7 @@ export async function removeTagFromDocument(documentId, tagId) {
 }
 
 export async function getDocumentTags(documentId) {
-  const response = await fetch(`${API_BASE}/documents/${documentId}/tags`);
+  const response = await apiFetch(`${API_BASE}/documents/${documentId}/tags`);
   return handleResponse(response);
 }
 
@@ -85,12 +101,28 @@ export async function getAllTags(search = null, skip = 0, limit = 5) {
   }
   params.append("skip", skip.toString());
   params.append("limit", limit.toString());
-  const response = await fetch(`${API_BASE}/tags?${params.toString()}`);
+  const response = await apiFetch(`${API_BASE}/tags?${params.toString()}`);
+  return handleResponse(response);
+}
+
+export async function autocompleteTags(query, limit = 10) {
+  const params = new URLSearchParams();
+  params.append("q", query);
+  params.append("limit", limit.toString());
+  const response = await apiFetch(`${API_BASE}/tags/autocomplete?${params.toString()}`);
+  return handleResponse(response);
+}
+
+export async function getTagFacets(tags = [], limit = 10) {
+  const params = new URLSearchParams();
+  tags.forEach((tag) => params.append("tag", tag));
+  params.append("limit", limit.toString());
+  const response = await apiFetch(`${API_BASE}/tags/facets?${params.toString()}`);
   return handleResponse(response);
 }
 
 export async function deleteTag(tagId) {
-  const response = await fetch(`${API_BASE}/tags/${tagId}`, {
+  const response = await apiFetch(`${API_BASE}/tags/${tagId}`, {
     method: "DELETE",
   });
   return handleResponse(response);
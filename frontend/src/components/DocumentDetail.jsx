@@ -2,13 +2,16 @@ import { useCallback, useEffect, useRef, useState } from "react";
 import { useNavigate, useParams } from "react-router-dom";
 import {
   addTagToDocument,
+  autocompleteTags,
   deleteDocument,
-  getAllTags,
   getDocument,
+  getDocumentPages,
   removeTagFromDocument,
 } from "../api";
 import { formatFileSize } from "../utils/formatters";
 
+const PAGES_PER_LOAD = 10;
+
 function DocumentDetail() {
   const { id } = useParams();
   const navigate = useNavigate();
@@ -19,14 +22,42 @@ function DocumentDetail() {
   const [addingTag, setAddingTag] = useState(false);
   const [tagSuggestions, setTagSuggestions] = useState([]);
   const [showSuggestions, setShowSuggestions] = useState(false);
+  const [content, setContent] = useState("");
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingPages, setLoadingPages] = useState(false);
   const tagInputRef = useRef(null);
   const suggestionsRef = useRef(null);
 
+  const loadPages = useCallback(
+    async (start) => {
+      try {
+        setLoadingPages(true);
+        const data = await getDocumentPages(id, start, PAGES_PER_LOAD);
+        if (start === 1 && data.pages.length === 0) {
+          // Documents stored before per-page text existed only have full content
+          const full = await getDocument(id);
+          setContent(full.content || "");
+          setNextPage(null);
+          return;
+        }
+        const text = data.pages.map((page) => page.text).join("");
+        setContent((prev) => (start === 1 ? text : prev + text));
+        const following = start + PAGES_PER_LOAD;
+        setNextPage(data.page_count && following <= data.page_count ? following : null);
+      } catch (err) {
+        console.error("Failed to load pages:", err);
+      } finally {
+        setLoadingPages(false);
+      }
+    },
+    [id]
+  );
+
   const loadDocument = useCallback(async () => {
     try {
       setLoading(true);
       setError(null);
-      const data = await getDocument(id);
+      const data = await getDocument(id, false);
       setDocument(data);
     } catch (err) {
       console.error("Failed to load document:", err);
@@ -40,6 +71,10 @@ function DocumentDetail() {
     loadDocument();
   }, [loadDocument]);
 
+  useEffect(() => {
+    loadPages(1);
+  }, [loadPages]);
+
   const handleDelete = useCallback(async () => {
     if (!window.confirm("Are you sure you want to delete this document?")) {
       return;
@@ -64,8 +99,7 @@ function DocumentDetail() {
       }
 
       try {
-        const data = await getAllTags(trimmedQuery, 0, 50);
-        const tags = data.items || data;
+        const tags = await autocompleteTags(trimmedQuery, 20);
         const existingTagNames = new Set(
           (document?.tags || []).map((t) => t.name.toLowerCase())
         );
@@ -246,8 +280,17 @@ function DocumentDetail() {
 
       <h3>Extracted Content</h3>
       <div className="content">
-        {document.content || "No content extracted"}
+        {content || (loadingPages ? "Loading..." : "No content extracted")}
       </div>
+      {nextPage && (
+        <button
+          className="load-more-btn"
+          onClick={() => loadPages(nextPage)}
+          disabled={loadingPages}
+        >
+          {loadingPages ? "Loading..." : "Load more pages"}
+        </button>
+      )}
 
       <div className="actions">
         <button className="back-btn" onClick={() => navigate("/")}>
@@ -2,6 +2,15 @@ import { useEffect, useRef, useState } from "react";
 import { Link } from "react-router-dom";
 import { searchDocuments } from "../api";
 
+// The API wraps matched terms in <mark>...</mark>; render them as elements
+// without injecting the snippet as HTML
+function renderSnippet(snippet) {
+  return snippet.split(/(<mark>.*?<\/mark>)/g).map((part, index) => {
+    const match = part.match(/^<mark>(.*)<\/mark>$/);
+    return match ? <mark key={index}>{match[1]}</mark> : part;
+  });
+}
+
 function SearchBar() {
   const [query, setQuery] = useState("");
   const [results, setResults] = useState([]);
@@ -71,7 +80,7 @@ function SearchBar() {
                 >
                   {result.filename}
                 </Link>
-                <div className="snippet">{result.snippet}</div>
+                <div className="snippet">{renderSnippet(result.snippet)}</div>
               </div>
             ))
           )}
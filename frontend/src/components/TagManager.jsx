@@ -94,7 +94,10 @@ function TagManager({ onTagDeleted }) {
           <div className="tags-manager-list">
             {tags.map((tag) => (
               <div key={tag.id} className="tag-manager-item">
-                <span className="tag-manager-name">{tag.name}</span>
+                <span className="tag-manager-name">
+                  {tag.name}
+                  <span className="tag-manager-count">{tag.document_count}</span>
+                </span>
                 <button
                   className="tag-manager-delete"
                   onClick={() => handleDeleteTag(tag.id, tag.name)}
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the PDF extraction engine (backend/app/services/pdf_processor).
+
+Generates deterministic fixture PDFs of different shapes and measures the
+extraction path that upload and ingest run inside an extraction worker:
+pages/sec, time per page and peak memory. Each fixture runs in a fresh
+process so memory figures do not leak from one fixture into the next.
+
+Usage:
+    pip install -r ../backend/requirements.txt
+    python pdf_benchmark.py --repeat 5 --output pdf-results.json
+
+    # After a parser change or PyMuPDF upgrade
+    python pdf_benchmark.py --output new.json --compare pdf-results.json
+
+Fixtures: text_heavy, many_small_pages, large_images, broken_pages.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+from benchmark_stats import percentile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog contract invoice payment policy security "
+    "revenue budget forecast compliance audit customer supplier warranty agreement"
+).split()
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _text_heavy(fitz, rng: random.Random, scale: int):
+    """Dense full pages of small type, the common case for contracts and reports."""
+    doc = fitz.open()
+    for _ in range(20 * scale):
+        page = doc.new_page()
+        page.insert_textbox(page.rect + (36, 36, -36, -36), _text(rng, 900), fontsize=7)
+    return doc
+
+
+def _many_small_pages(fitz, rng: random.Random, scale: int):
+    """Hundreds of tiny pages with one line each: per-page overhead dominates."""
+    doc = fitz.open()
+    for _ in range(500 * scale):
+        page = doc.new_page(width=200, height=100)
+        page.insert_text((10, 50), _text(rng, 6), fontsize=8)
+    return doc
+
+
+def _large_images(fitz, rng: random.Random, scale: int):
+    """Pages holding a large incompressible image and a caption, like scans with OCR text."""
+    doc = fitz.open()
+    side = 1500
+    for _ in range(8 * scale):
+        samples = rng.randbytes(side * side * 3)
+        pixmap = fitz.Pixmap(fitz.csRGB, side, side, samples, False)
+        page = doc.new_page()
+        page.insert_image(page.rect + (36, 72, -36, -36), pixmap=pixmap)
+        page.insert_text((36, 50), _text(rng, 12), fontsize=10)
+    return doc
+
+
+def _broken_pages(fitz, rng: random.Random, scale: int):
+    """Every third page has a corrupted content stream; the rest are normal text."""
+    doc = fitz.open()
+    for _ in range(30 * scale):
+        page = doc.new_page()
+        page.insert_textbox(page.rect + (36, 36, -36, -36), _text(rng, 300), fontsize=9)
+    for page_number in range(0, len(doc), 3):
+        page = doc[page_number]
+        page.clean_contents()
+        garbage = b"BT /F9 12 Tf ( unterminated " + rng.randbytes(512) + b" ET Q Q Tj"
+        doc.update_stream(page.get_contents()[0], garbage)
+    return doc
+
+
+FIXTURES = {
+    "text_heavy": _text_heavy,
+    "many_small_pages": _many_small_pages,
+    "large_images": _large_images,
+    "broken_pages": _broken_pages,
+}
+
+
+def build_fixtures(names: list[str], directory: str, seed: int, scale: int) -> dict[str, str]:
+    """Write each fixture PDF to directory; the same seed and scale give the same content."""
+    import fitz
+
+    paths = {}
+    for name in names:
+        path = os.path.join(directory, f"{name}.pdf")
+        doc = FIXTURES[name](fitz, random.Random(f"{seed}:{name}"), scale)
+        doc.save(path, garbage=3, deflate=True)
+        doc.close()
+        paths[name] = path
+    return paths
+
+
+# ---------------------------------------------------------------------------
+# Measurement (runs in a fresh process per fixture)
+# ---------------------------------------------------------------------------
+
+
+def _proc_status_bytes(field: str):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> int:
+    """
+    Reset the peak RSS high-water mark where the OS allows it and return current RSS.
+
+    Linux resets VmHWM on writing 5 to clear_refs. Elsewhere the peak includes
+    imports, and the reported delta can understate small fixtures.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+    return _proc_status_bytes("VmRSS") or _peak_rss_bytes()
+
+
+def _peak_rss_bytes() -> int:
+    peak = _proc_status_bytes("VmHWM")
+    if peak is not None:
+        return peak
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def measure_fixture(path: str, repeat: int) -> dict:
+    """Extract path once to warm up, then repeat times, with _extract_pages_sync."""
+    sys.path.insert(0, BACKEND_DIR)
+    # Settings validation requires these; the extraction path never connects
+    os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://benchmark@localhost/unused")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    import fitz
+    from app.services.pdf_processor import _extract_pages_sync
+
+    # Before the warmup, which is the first extraction and so the one that sets the peak
+    baseline_rss = _reset_peak_rss()
+    pages, page_count, _ = _extract_pages_sync(path)
+
+    runs = []
+    page_seconds = []
+    tracemalloc.start()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages, page_count, seconds = _extract_pages_sync(path)
+        runs.append(time.perf_counter() - start)
+        page_seconds.extend(seconds)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "runs": runs,
+        "page_seconds": page_seconds,
+        "page_count": page_count,
+        "chars": sum(len(text) for text in pages),
+        "empty_pages": sum(1 for text in pages if not text.strip()),
+        "baseline_rss": baseline_rss,
+        "peak_rss": _peak_rss_bytes(),
+        "python_peak": python_peak,
+        "pymupdf": fitz.VersionBind,
+    }
+
+
+def summarize(path: str, raw: dict) -> dict:
+    median = statistics.median(raw["runs"])
+    page_ms = sorted(seconds * 1000 for seconds in raw["page_seconds"])
+    return {
+        "pages": raw["page_count"],
+        "file_bytes": os.path.getsize(path),
+        "chars": raw["chars"],
+        "empty_pages": raw["empty_pages"],
+        "seconds_median": round(median, 4),
+        "seconds_min": round(min(raw["runs"]), 4),
+        "seconds_stdev": round(statistics.pstdev(raw["runs"]), 4),
+        "pages_per_sec": round(raw["page_count"] / median, 1) if median else 0.0,
+        "page_ms": {
+            "p50": round(percentile(page_ms, 0.50), 3),
+            "p95": round(percentile(page_ms, 0.95), 3),
+            "max": round(page_ms[-1], 3),
+        },
+        # Resident memory added by extraction above the idle process, including MuPDF's C heap
+        "peak_rss_mb": round(max(raw["peak_rss"] - raw["baseline_rss"], 0) / 2**20, 1),
+        "process_peak_rss_mb": round(raw["peak_rss"] / 2**20, 1),
+        # Python objects only (page strings and lists)
+        "python_peak_mb": round(raw["python_peak"] / 2**20, 1),
+    }
+
+
+def compare(baseline: dict, results: dict) -> None:
+    print(f"{'fixture':<18} {'metric':<14} {'baseline':>10} {'new':>10} {'change':>8}")
+    for name, new in results["fixtures"].items():
+        old = baseline["fixtures"].get(name)
+        if old is None:
+            continue
+        for metric in ("pages_per_sec", "seconds_median", "peak_rss_mb"):
+            old_value, new_value = old[metric], new[metric]
+            change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+            print(f"{name:<18} {metric:<14} {old_value:>10} {new_value:>10} {change:>7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=",".join(FIXTURES), help="Comma-separated fixture names")
+    parser.add_argument("--repeat", type=int, default=5, help="Measured extractions per fixture")
+    parser.add_argument("--scale", type=int, default=1, help="Multiply fixture page counts")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--keep-fixtures", help="Write fixture PDFs to this directory and keep them")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    parser.add_argument("--compare", help="Print changes against a previous results file")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.fixtures.split(",") if name.strip()]
+    unknown = [name for name in names if name not in FIXTURES]
+    if unknown:
+        sys.exit(f"Unknown fixture(s): {', '.join(unknown)}. Choose from {', '.join(FIXTURES)}")
+
+    results = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "repeat": args.repeat,
+            "scale": args.scale,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "fixtures": {},
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directory = args.keep_fixtures or temp_dir
+        os.makedirs(directory, exist_ok=True)
+        print(f"Generating fixtures in {directory}...")
+        paths = build_fixtures(names, directory, args.seed, args.scale)
+
+        for name in names:
+            # A fresh interpreter per fixture: peak RSS is a process-wide high-water mark
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                raw = executor.submit(measure_fixture, paths[name], args.repeat).result()
+            results["meta"]["pymupdf"] = raw["pymupdf"]
+            summary = summarize(paths[name], raw)
+            results["fixtures"][name] = summary
+            print(
+                f"  {name}: {summary['pages']} pages, {summary['pages_per_sec']} pages/s, "
+                f"p95 {summary['page_ms']['p95']} ms/page, +{summary['peak_rss_mb']} MB RSS"
+            )
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Results written to {args.output}")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -182,11 +182,11 @@ def upload_document(filepath: str) -> dict:
         return response.json()
 
 
-def add_tag_to_document(document_id: int, tag_name: str) -> dict:
-    """Add a tag to a document."""
+def attach_tag_to_documents(tag_name: str, document_ids: list) -> dict:
+    """Add a tag to many documents in one request."""
     response = requests.post(
-        f"{API_URL}/documents/{document_id}/tags",
-        json={"name": tag_name},
+        f"{API_URL}/tags/bulk/attach",
+        json={"document_ids": document_ids, "tags": [tag_name]},
         headers={"Content-Type": "application/json"},
     )
     response.raise_for_status()
@@ -197,6 +197,8 @@ def main():
     print(f"Seeding documents to {API_URL}")
     print("-" * 40)
 
+    documents_by_tag = {}
+
     for doc in SAMPLE_DOCUMENTS:
         print(f"Creating {doc['filename']}...")
         filepath = create_pdf(doc["filename"], doc["title"], doc["content"])
@@ -206,18 +208,19 @@ def main():
         document_id = result["id"]
         print(f"  Created document ID: {document_id}")
 
-        # Add tags to the document
-        tags = doc.get("tags", [])
-        if tags:
-            print(f"  Adding tags: {', '.join(tags)}")
-            for tag_name in tags:
-                try:
-                    add_tag_to_document(document_id, tag_name)
-                except Exception as e:
-                    print(f"    Warning: Failed to add tag '{tag_name}': {e}")
+        for tag_name in doc.get("tags", []):
+            documents_by_tag.setdefault(tag_name, []).append(document_id)
 
         os.remove(filepath)
 
+    # One request per tag instead of one per (document, tag) pair
+    for tag_name, document_ids in documents_by_tag.items():
+        print(f"Tagging {len(document_ids)} document(s) with '{tag_name}'...")
+        try:
+            attach_tag_to_documents(tag_name, document_ids)
+        except Exception as e:
+            print(f"  Warning: Failed to add tag '{tag_name}': {e}")
+
     print("-" * 40)
     print(f"Successfully seeded {len(SAMPLE_DOCUMENTS)} documents")
 
@@ -64,8 +64,81 @@ fi
 
 echo ""
 
+# Reenvio do mesmo PDF: a busca deve devolver cada documento uma única vez
+echo "5️⃣  Testando busca com documento duplicado..."
+TMP_DIR=$(mktemp -d)
+# PDF mínimo de uma página; o PyMuPDF reconstrói a tabela xref ausente
+printf '%s\n' '%PDF-1.4' \
+    '1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj' \
+    '2 0 obj << /Type /Pages /Kids [3 0 R] /Count 1 >> endobj' \
+    '3 0 obj << /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >> endobj' \
+    '4 0 obj << /Length 44 >> stream' \
+    'BT /F1 12 Tf 72 720 Td (quarterly report) Tj ET' \
+    'endstream endobj' \
+    '5 0 obj << /Type /Font /Subtype /Type1 /BaseFont /Helvetica >> endobj' \
+    'trailer << /Root 1 0 R >>' \
+    '%%EOF' > "$TMP_DIR/report.pdf"
+FIRST_ID=$(curl -s -F "file=@$TMP_DIR/report.pdf;type=application/pdf" http://localhost:8000/documents \
+    | python3 -c "import json, sys; print(json.load(sys.stdin).get('id', ''))")
+SECOND_ID=$(curl -s -F "file=@$TMP_DIR/report.pdf;type=application/pdf" http://localhost:8000/documents \
+    | python3 -c "import json, sys; print(json.load(sys.stdin).get('id', ''))")
+REPEATED=$(curl -s "http://localhost:8000/search?q=report&limit=100" \
+    | python3 -c "import collections, json, sys; print(sum(1 for n in collections.Counter(r['id'] for r in json.load(sys.stdin)).values() if n > 1))")
+if [ -n "$FIRST_ID" ] && [ -n "$SECOND_ID" ] && [ "$REPEATED" = "0" ]; then
+    echo -e "${GREEN}✓ Cada documento aparece uma vez na busca${NC}"
+else
+    echo -e "${RED}✗ Documentos repetidos na busca por \"report\" ($REPEATED)${NC}"
+fi
+for DOC_ID in $FIRST_ID $SECOND_ID; do
+    curl -s -X DELETE "http://localhost:8000/documents/$DOC_ID" > /dev/null
+done
+rm -rf "$TMP_DIR"
+
+echo ""
+
+# Atualização de um banco antigo: documentos de antes da coluna search_vector
+# precisam continuar aparecendo na busca
+echo "6️⃣  Testando busca em banco atualizado..."
+if docker ps | grep -q "docproc-db"; then
+    UPGRADE_DB=docproc_upgrade_test
+    docker-compose exec -T db psql -U postgres -q \
+        -c "DROP DATABASE IF EXISTS $UPGRADE_DB" -c "CREATE DATABASE $UPGRADE_DB" > /dev/null
+    # Esquema original da tabela documents, com um documento já processado
+    docker-compose exec -T db psql -U postgres -q -d $UPGRADE_DB \
+        -c "CREATE TABLE documents (id SERIAL PRIMARY KEY, filename VARCHAR(255) NOT NULL, content TEXT, file_size INTEGER, page_count INTEGER, created_at TIMESTAMP)" \
+        -c "INSERT INTO documents (filename, content, page_count, created_at) VALUES ('legacy.pdf', 'Quarterly invoice sent before the upgrade', 1, now())" > /dev/null
+    FOUND=$(docker-compose exec -T -e DATABASE_URL=postgresql+asyncpg://postgres:postgres@db:5432/$UPGRADE_DB backend python - <<'PY' 2>/dev/null || echo 0
+import asyncio
+
+from app.database import async_session, engine, init_db
+from app.routes.search import _build_search_query
+
+
+async def main():
+    await init_db()
+    async with async_session() as db:
+        rows = (await db.execute(_build_search_query("invoice", 10, 0, 2, 20))).fetchall()
+    await engine.dispose()
+    print(sum(1 for row in rows if row[1] == "legacy.pdf" and "<mark>" in (row[2] or "")))
+
+
+asyncio.run(main())
+PY
+)
+    docker-compose exec -T db psql -U postgres -q -c "DROP DATABASE IF EXISTS $UPGRADE_DB" > /dev/null
+    if [ "$FOUND" = "1" ]; then
+        echo -e "${GREEN}✓ Documento anterior à atualização encontrado pela busca${NC}"
+    else
+        echo -e "${RED}✗ Documento anterior à atualização não aparece na busca${NC}"
+    fi
+else
+    echo -e "${YELLOW}⚠ Banco de dados não está rodando no Docker${NC}"
+fi
+
+echo ""
+
 # Verificar banco de dados (se Docker estiver rodando)
-echo "5️⃣  Verificando Banco de Dados..."
+echo "7️⃣  Verificando Banco de Dados..."
 if docker ps | grep -q "docproc-db"; then
     DB_COUNT=$(docker-compose exec -T db psql -U postgres -d docproc -t -c "SELECT COUNT(*) FROM documents;" 2>/dev/null | tr -d ' ' || echo "0")
     if [ ! -z "$DB_COUNT" ] && [ "$DB_COUNT" != "0" ]; then